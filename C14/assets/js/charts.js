@@ -8,17 +8,11 @@ const Charts = (function() {
 
     /**
      * Renders a pie chart showing the distribution of materials for a site.
-     * @param {Array<Object>} relatedFeatures - All features for the same site.
+     * @param {Map<string, Object>} materialCells - Stats cube cells of the site, by material.
      */
-    function renderMaterialDistributionChart(relatedFeatures) {
-        const materialCounts = relatedFeatures.reduce((acc, feature) => {
-            const material = feature.properties.material || 'Unknown';
-            acc[material] = (acc[material] || 0) + 1;
-            return acc;
-        }, {});
-
-        const labels = Object.keys(materialCounts);
-        const data = Object.values(materialCounts);
+    function renderMaterialDistributionChart(materialCells) {
+        const labels = Array.from(materialCells.keys());
+        const data = Array.from(materialCells.values(), cell => cell.count);
 
         if (labels.length === 0) {
             document.getElementById('material-chart-placeholder').innerHTML = '<p>No material data available for this site.</p>';
@@ -70,47 +64,36 @@ const Charts = (function() {
 
     /**
      * Renders a histogram showing the distribution of radiocarbon dates over time.
-     * @param {Array<Object>} relatedFeatures - All features for the same site.
+     * @param {Object|null} cell - Stats cube cell of the site's C14 dates.
+     * @param {number} binSize - Bin size in years of the cube's bp histogram.
      */
-    function renderDateDistributionChart(relatedFeatures) {
-        const dates = relatedFeatures
-            .map(feature => feature.properties.bp)
-            .filter(bp => bp !== null && bp !== undefined)
-            .sort((a, b) => a - b);
+    function renderDateDistributionChart(cell, binSize) {
+        const histogram = cell ? cell.bpHistogram : new Map();
+        const total = Array.from(histogram.values()).reduce((sum, n) => sum + n, 0);
 
-        if (dates.length === 0) {
+        if (total === 0) {
             document.getElementById('date-chart-placeholder').innerHTML = '<p>No radiocarbon dates available for this site.</p>';
             return;
         }
 
-        if (dates.length < 2) {
+        if (total < 2) {
             document.getElementById('date-chart-placeholder').innerHTML = '<p>Not enough data to display a distribution.</p>';
             return;
         }
 
-        // Basic histogram binning
-        const minDate = Math.min(...dates);
-        const maxDate = Math.max(...dates);
-        const binSize = 500; // Bin size in years
-        const numBins = Math.ceil((maxDate - minDate) / binSize);
-        const bins = new Array(numBins).fill(0);
+        // Include the empty bins between the oldest and youngest date.
+        const starts = Array.from(histogram.keys());
+        const minDate = Math.min(...starts);
+        const numBins = (Math.max(...starts) - minDate) / binSize + 1;
+        const bins = new Array(numBins);
         const labels = new Array(numBins);
 
         for (let i = 0; i < numBins; i++) {
-            labels[i] = `${minDate + i * binSize} - ${minDate + (i + 1) * binSize} BP`;
+            const start = minDate + i * binSize;
+            labels[i] = `${start} - ${start + binSize} BP`;
+            bins[i] = histogram.get(start) || 0;
         }
 
-        dates.forEach(date => {
-            let binIndex = Math.floor((date - minDate) / binSize);
-            // Ensure the max date is included in the last bin
-            if (binIndex === numBins) {
-                binIndex--;
-            }
-            if(binIndex < bins.length){
-                bins[binIndex]++;
-            }
-        });
-
         const ctx = document.getElementById('dateChart').getContext('2d');
         new Chart(ctx, {
             type: 'bar',
@@ -160,15 +143,10 @@ const Charts = (function() {
 
     /**
      * Renders a box plot showing the distribution of standard deviation (std) values.
-     * @param {Array<Object>} relatedFeatures - All features for the same site.
+     * @param {Object|null} cell - Stats cube cell of the site's C14 dates.
      */
-    function renderStdDistributionChart(relatedFeatures) {
-        const stdValues = relatedFeatures
-            .map(feature => feature.properties.std)
-            .filter(std => std !== null && std !== undefined)
-            .sort((a, b) => a - b);
-
-        if (stdValues.length === 0) {
+    function renderStdDistributionChart(cell) {
+        if (!cell || !cell.stdQuantiles) {
             document.getElementById('std-chart-placeholder').innerHTML = '<p>No standard deviation data available for this site.</p>';
             return;
         }
@@ -180,7 +158,13 @@ const Charts = (function() {
                 labels: ['Standard Deviation'],
                 datasets: [{
                     label: 'Standard Deviation (std)',
-                    data: [stdValues],
+                    data: [{
+                        min: cell.stdQuantiles[0],
+                        q1: cell.stdQuantiles[1],
+                        median: cell.stdQuantiles[2],
+                        q3: cell.stdQuantiles[3],
+                        max: cell.stdQuantiles[4]
+                    }],
                     backgroundColor: 'rgba(255, 99, 132, 0.8)',
                     borderColor: 'rgba(255, 99, 132, 1)',
                     borderWidth: 1
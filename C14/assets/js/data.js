@@ -6,7 +6,116 @@
  */
 const Data = (function() {
 
-    const DATA_URL = 'data/output_standardized.geojson';
+    // Written by scripts/bibliography.py: records cite references by ID.
+    const DATA_URL = 'data/output_compact.geojson';
+    const BIBLIOGRAPHY_URL = 'data/bibliography.json';
+    // Written by scripts/stats_cube.py: precomputed chart statistics.
+    const STATS_CUBE_URL = 'data/stats_cube.json';
+
+    let bibliographyPromise = null;
+    let statsCubePromise = null;
+
+    /**
+     * Fetches the bibliography: `references` maps reference IDs to
+     * {author, year, label}. The inverted index (citing features, dates,
+     * lab numbers and sites) is in data/reference_index.json.
+     * @returns {Promise<Object>} A promise that resolves with the bibliography.
+     */
+    function getBibliography() {
+        if (!bibliographyPromise) {
+            bibliographyPromise = fetch(BIBLIOGRAPHY_URL).then(response => {
+                if (!response.ok) {
+                    throw new Error(`Network response was not ok: ${response.statusText}`);
+                }
+                return response.json();
+            });
+            // Allow a retry after a failed request.
+            bibliographyPromise.catch(() => { bibliographyPromise = null; });
+        }
+        return bibliographyPromise;
+    }
+
+    /**
+     * Wraps a cube written by scripts/stats_cube.py in lookup functions,
+     * mirroring its StatsCube class.
+     * @param {Object} cube - The parsed stats_cube.json.
+     * @returns {Object} {bpBin, stdBin, values, cell, groupBy}.
+     */
+    function statsCube(cube) {
+        const codes = {};
+        cube.dimensions.forEach(dimension => {
+            codes[dimension] = new Map(cube.values[dimension].map((value, code) => [value, code]));
+        });
+        const groupings = {};
+
+        function grouping(dimensions) {
+            const name = dimensions.join('+') || '*';
+            if (!groupings[name]) {
+                groupings[name] = new Map(cube.cells[name].map(row => [row.slice(0, -1).join(','), row[row.length - 1]]));
+            }
+            return groupings[name];
+        }
+
+        function histogram(flat, width) {
+            const bins = new Map();
+            for (let i = 0; i < flat.length; i += 2) bins.set(flat[i] * width, flat[i + 1]);
+            return bins;
+        }
+
+        /**
+         * Statistics of the dates matching every filter.
+         * @param {Object} [filters] - e.g. {site: 'Acusa', method: 'C14'}.
+         * @returns {Object|null} {count, bpHistogram, stdHistogram, bpQuantiles, stdQuantiles};
+         *     histograms map bin starts to counts, quantiles are [min, q1, median, q3, max].
+         */
+        function cell(filters = {}) {
+            const dimensions = cube.dimensions.filter(dimension => dimension in filters);
+            const key = dimensions.map(dimension => codes[dimension].get(filters[dimension]));
+            if (key.includes(undefined)) return null;
+            const number = grouping(dimensions).get(key.join(','));
+            if (number === undefined) return null;
+            const [count, bp, std, bpQuantiles, stdQuantiles] = cube.stats[number];
+            return {
+                count,
+                bpHistogram: histogram(bp, cube.bp_bin),
+                stdHistogram: histogram(std, cube.std_bin),
+                bpQuantiles,
+                stdQuantiles
+            };
+        }
+
+        /**
+         * Cells for every value of a dimension among the dates matching the filters.
+         * @returns {Map<string, Object>} value -> cell.
+         */
+        function groupBy(dimension, filters = {}) {
+            const result = new Map();
+            cube.values[dimension].forEach(value => {
+                const found = cell({ ...filters, [dimension]: value });
+                if (found) result.set(value, found);
+            });
+            return result;
+        }
+
+        return { bpBin: cube.bp_bin, stdBin: cube.std_bin, values: dimension => cube.values[dimension].slice(), cell, groupBy };
+    }
+
+    /**
+     * Fetches the statistics cube.
+     * @returns {Promise<Object>} A promise that resolves with {bpBin, stdBin, values, cell, groupBy}.
+     */
+    function getStatsCube() {
+        if (!statsCubePromise) {
+            statsCubePromise = fetch(STATS_CUBE_URL).then(response => {
+                if (!response.ok) {
+                    throw new Error(`Network response was not ok: ${response.statusText}`);
+                }
+                return response.json();
+            }).then(statsCube);
+            statsCubePromise.catch(() => { statsCubePromise = null; });
+        }
+        return statsCubePromise;
+    }
 
     /**
      * Fetches and parses the GeoJSON dataset.
@@ -15,7 +124,7 @@ const Data = (function() {
      */
     async function getFeatures() {
         try {
-            const response = await fetch(DATA_URL);
+            const [response, bibliography] = await Promise.all([fetch(DATA_URL), getBibliography()]);
             if (!response.ok) {
                 throw new Error(`Network response was not ok: ${response.statusText}`);
             }
@@ -23,6 +132,13 @@ const Data = (function() {
             if (!data || !data.features || !Array.isArray(data.features)) {
                 throw new Error('Invalid GeoJSON format: "features" array not found.');
             }
+            // Resolve reference IDs to shared, already-normalised entries.
+            data.features.forEach(feature => {
+                const refs = feature.properties && feature.properties.references;
+                if (Array.isArray(refs)) {
+                    feature.properties.references = refs.map(id => bibliography.references[id]).filter(Boolean);
+                }
+            });
             return data.features;
         } catch (error) {
             console.error('Failed to load dataset:', error);
@@ -32,7 +148,9 @@ const Data = (function() {
     }
 
     return {
-        getFeatures
+        getFeatures,
+        getBibliography,
+        getStatsCube
     };
 
 })();
@@ -34,14 +34,11 @@ async function displayStatistics() {
         document.getElementById('typological-dates').textContent = totalTypologicalDates;
 
 
-        // Process data for the period chart
-        const periodCounts = features.reduce((acc, feature) => {
-            const period = feature.properties.period || 'Unknown';
-            acc[period] = (acc[period] || 0) + 1;
-            return acc;
-        }, {});
-
-        const sortedPeriods = Object.entries(periodCounts).sort(([, a], [, b]) => b - a);
+        // Period counts are precomputed by scripts/stats_cube.py
+        const cube = await Data.getStatsCube();
+        const periodCounts = Array.from(cube.groupBy('period'), ([period, cell]) => [period, cell.count]);
+
+        const sortedPeriods = periodCounts.sort(([, a], [, b]) => b - a);
         const chartLabels = sortedPeriods.map(entry => entry[0]);
         const chartData = sortedPeriods.map(entry => entry[1]);
 
@@ -52,7 +49,7 @@ async function displayStatistics() {
             data: {
                 labels: chartLabels,
                 datasets: [{
-                    label: 'Number of Sites',
+                    label: 'Number of Dates',
                     data: chartData,
                     backgroundColor: 'rgba(25, 118, 210, 0.8)',
                     borderColor: 'rgba(25, 118, 210, 1)',
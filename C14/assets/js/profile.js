@@ -44,7 +44,7 @@ const Profile = (function(Data, Graph) {
                 throw new Error('No site identifier (labnr or site) provided in the URL.');
             }
 
-            const features = await Data.getFeatures();
+            const [features, cube] = await Promise.all([Data.getFeatures(), Data.getStatsCube()]);
             let siteFeature;
 
             if (isValidLabnr) {
@@ -62,7 +62,7 @@ const Profile = (function(Data, Graph) {
             const siteName = siteFeature.properties.site;
             const relatedSiteFeatures = features.filter(f => f.properties.site === siteName);
 
-            renderProfile(siteFeature.properties, relatedSiteFeatures);
+            renderProfile(siteFeature.properties, relatedSiteFeatures, cube);
 
         } catch (error) {
             renderError(error.message);
@@ -74,8 +74,9 @@ const Profile = (function(Data, Graph) {
      * Renders the entire profile page.
      * @param {Object} properties - The properties of the main site feature.
      * @param {Array<Object>} relatedFeatures - All features for the same site.
+     * @param {Object} cube - The statistics cube from Data.getStatsCube().
      */
-    function renderProfile(properties, relatedFeatures) {
+    function renderProfile(properties, relatedFeatures, cube) {
         siteTitleElement.textContent = properties.site || 'Unnamed Site';
 
         renderMainDataTable(properties);
@@ -84,9 +85,11 @@ const Profile = (function(Data, Graph) {
 
         renderDatingEvidenceTable(relatedFeatures);
 
-        Charts.renderMaterialDistributionChart(relatedFeatures);
-        Charts.renderDateDistributionChart(relatedFeatures);
-        Charts.renderStdDistributionChart(relatedFeatures);
+        const site = properties.site || 'Unknown';
+        const c14 = cube.cell({ site, method: 'C14' });
+        Charts.renderMaterialDistributionChart(cube.groupBy('material', { site }));
+        Charts.renderDateDistributionChart(c14, cube.bpBin);
+        Charts.renderStdDistributionChart(c14);
 
         const firstC14Date = relatedFeatures
             .flatMap(f => f.properties.dates || [])
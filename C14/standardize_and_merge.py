@@ -1,9 +1,10 @@
 
 import json
+import os
 
-def standardize_and_merge():
+def standardize_and_merge(input_path='C14/data/output_full.geojson', output_path='C14/data/output_standardized.geojson'):
     # Load the existing GeoJSON data
-    with open('C14/data/output_full.geojson', 'r') as f:
+    with open(input_path, 'r') as f:
         geojson_data = json.load(f)
 
     # Standardize the existing features
@@ -103,9 +104,12 @@ def standardize_and_merge():
     # Add the new feature to the GeoJSON data
     geojson_data['features'].append(jebel_irhoud_feature)
 
-    # Save the updated GeoJSON data
-    with open('C14/data/output_standardized.geojson', 'w') as f:
+    # Save the updated GeoJSON data; write to a temporary file first so a
+    # crash never leaves a truncated output behind.
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(geojson_data, f, indent=2)
+    os.replace(tmp_path, output_path)
 
 if __name__ == '__main__':
     standardize_and_merge()
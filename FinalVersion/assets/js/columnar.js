@@ -0,0 +1,150 @@
+// Decoder for the columnar dataset files written by scripts/export_columnar.py
+// Version: 1.0
+// License: MIT
+
+"use strict";
+
+const RQ_COLUMNAR_MAGIC = 'RQCOL001';
+const RQ_COLUMNAR_VERSION = 2;
+
+const RQ_COLUMNAR_TYPES = {
+    uint8: Uint8Array,
+    uint16: Uint16Array,
+    uint32: Uint32Array,
+    float64: Float64Array
+};
+
+class RQColumnarTable {
+    /**
+     * Wraps a container's bytes. Columns are views onto the buffer, so
+     * decoding copies nothing but the JSON header.
+     * @param {ArrayBuffer} buffer - The file contents.
+     */
+    constructor(buffer) {
+        const bytes = new Uint8Array(buffer);
+        const magic = String.fromCharCode(...bytes.subarray(0, 8));
+        if (magic !== RQ_COLUMNAR_MAGIC) {
+            throw new Error('Not a columnar RQpedia file');
+        }
+        const headerLength = new DataView(buffer).getUint32(8, true);
+        const bodyStart = 12 + headerLength;
+        const header = JSON.parse(new TextDecoder().decode(bytes.subarray(12, bodyStart)));
+        if (header.version !== RQ_COLUMNAR_VERSION) {
+            throw new Error(`Unsupported columnar version ${header.version}`);
+        }
+
+        this.length = header.length;
+        const view = column => {
+            const ArrayType = RQ_COLUMNAR_TYPES[column.dtype];
+            // The body is 8-byte aligned in the file, so these views are aligned too.
+            column.values = new ArrayType(buffer, bodyStart + column.offset, this.length);
+            return column;
+        };
+        // Properties and geometry are kept apart, so a property named 'lat'
+        // or 'geometry' cannot shadow the coordinates.
+        this.columns = {};
+        this.names = [];
+        header.columns.forEach(column => {
+            this.columns[column.name] = view(column);
+            this.names.push(column.name);
+        });
+        this.geometry = {};
+        header.geometry.forEach(column => { this.geometry[column.name] = view(column); });
+    }
+
+    // --- Public API ---
+
+    /**
+     * The typed array behind a property column: dictionary codes for 'dict'
+     * columns, Float64Array for numbers (NaN where missing).
+     * @param {string} name - The column name (e.g., 'bp', 'site').
+     * @returns {Float64Array|Uint8Array|Uint16Array|Uint32Array}
+     */
+    array(name) {
+        return this.columns[name].values;
+    }
+
+    /**
+     * The point coordinates of every record (NaN where a record has no
+     * geometry), or null when the geometries are not all points.
+     * @returns {{lon: Float64Array, lat: Float64Array}|null}
+     */
+    coordinates() {
+        if (!this.geometry.lon) return null;
+        return { lon: this.geometry.lon.values, lat: this.geometry.lat.values };
+    }
+
+    /**
+     * The distinct values of a dictionary-encoded column, indexed by code.
+     * @param {string} name - The column name.
+     * @returns {Array}
+     */
+    dictionary(name) {
+        return this.columns[name].dictionary;
+    }
+
+    /**
+     * Decodes a single property value, as it appeared in the GeoJSON.
+     * @param {string} name - The column name.
+     * @param {number} i - The record index.
+     * @returns {*} The value, or undefined when the record lacks the property.
+     */
+    value(name, i) {
+        return this._decode(this.columns[name], i);
+    }
+
+    _decode(column, i) {
+        const raw = column.values[i];
+        if (column.type === 'dict') {
+            return raw === column.absent ? undefined : column.dictionary[raw];
+        }
+        if (Number.isNaN(raw)) return column.missing;
+        if (column.type === 'number' && column.string) {
+            // Matches the exporter's formatting, e.g. 3490 -> '3490.0'.
+            return Number.isInteger(raw) && Math.abs(raw) < 1e15 ? raw.toFixed(1) : String(raw);
+        }
+        return raw;
+    }
+
+    /**
+     * Rebuilds one GeoJSON feature.
+     * @param {number} i - The record index.
+     * @returns {object}
+     */
+    feature(i) {
+        const properties = {};
+        this.names.forEach(name => {
+            const value = this.value(name, i);
+            if (value !== undefined) properties[name] = value;
+        });
+        let geometry = null;
+        if (this.geometry.lon) {
+            const lon = this.geometry.lon.values[i];
+            if (!Number.isNaN(lon)) {
+                geometry = { type: 'Point', coordinates: [lon, this.geometry.lat.values[i]] };
+            }
+        } else if (this.geometry.geometry) {
+            geometry = this._decode(this.geometry.geometry, i) ?? null;
+        }
+        return { type: 'Feature', properties, geometry };
+    }
+
+    /**
+     * Rebuilds every feature, e.g. for a GeoJSON download.
+     * @returns {object[]}
+     */
+    toFeatures() {
+        return Array.from({ length: this.length }, (_, i) => this.feature(i));
+    }
+}
+
+/**
+ * Fetches and decodes a columnar dataset.
+ * @param {string} url - The .rqc file to load.
+ * @returns {Promise<RQColumnarTable>}
+ */
+async function loadColumnar(url) {
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`Failed to load ${url}`);
+    return new RQColumnarTable(await res.arrayBuffer());
+}
@@ -0,0 +1,143 @@
+// Reader for the facet bitmap files written by scripts/facets.py
+// Version: 1.0
+// License: MIT
+
+"use strict";
+
+const RQ_FACETS_MAGIC = 'RQFACET1';
+
+function rqPopcount(word) {
+    word -= (word >>> 1) & 0x55555555;
+    word = (word & 0x33333333) + ((word >>> 2) & 0x33333333);
+    return (((word + (word >>> 4)) & 0x0F0F0F0F) * 0x01010101) >>> 24;
+}
+
+class RQFacetIndex {
+    /**
+     * Decodes every facet value into a bitset (one bit per record, in the
+     * record order of the dataset and its columnar export).
+     * @param {ArrayBuffer} buffer - The file contents.
+     */
+    constructor(buffer) {
+        const bytes = new Uint8Array(buffer);
+        if (String.fromCharCode(...bytes.subarray(0, 8)) !== RQ_FACETS_MAGIC) {
+            throw new Error('Not an RQpedia facet file');
+        }
+        const headerLength = new DataView(buffer).getUint32(8, true);
+        const bodyStart = 12 + headerLength;
+        const header = JSON.parse(new TextDecoder().decode(bytes.subarray(12, bodyStart)));
+
+        this.length = header.length;
+        this.words = Math.ceil(this.length / 32);
+        this.facets = {};
+        this.totals = {};
+        Object.entries(header.facets).forEach(([facet, entries]) => {
+            this.facets[facet] = new Map();
+            this.totals[facet] = new Map();
+            entries.forEach(entry => {
+                const ArrayType = entry.dtype === 'uint16' ? Uint16Array : Uint32Array;
+                const values = new ArrayType(buffer, bodyStart + entry.offset, entry.size);
+                this.facets[facet].set(entry.value, this._decode(entry.encoding, values));
+                this.totals[facet].set(entry.value, entry.count);
+            });
+        });
+    }
+
+    _decode(encoding, values) {
+        if (encoding === 'bitmap') return Uint32Array.from(values);
+        const bits = new Uint32Array(this.words);
+        const set = i => { bits[i >>> 5] |= 1 << (i & 31); };
+        if (encoding === 'array') {
+            values.forEach(set);
+        } else {
+            for (let r = 0; r < values.length; r += 2) {
+                for (let i = values[r]; i < values[r] + values[r + 1]; i++) set(i);
+            }
+        }
+        return bits;
+    }
+
+    // --- Public API ---
+
+    /**
+     * The bitset of one facet value (all zero if the value does not occur).
+     * @param {string} facet - The facet (e.g., 'material').
+     * @param {*} value - The facet value (e.g., 'charcoal').
+     * @returns {Uint32Array}
+     */
+    bitmap(facet, value) {
+        return this.facets[facet]?.get(value) || new Uint32Array(this.words);
+    }
+
+    /**
+     * Selects the records matching the filters: values of one facet are
+     * OR-ed, facets are AND-ed.
+     * @param {Object<string, Array>} filters - e.g. {material: ['charcoal', 'charbon']}.
+     * @returns {Uint32Array} The selection bitset.
+     */
+    select(filters) {
+        const selection = new Uint32Array(this.words).fill(0xFFFFFFFF);
+        if (this.length % 32) selection[this.words - 1] = (1 << (this.length % 32)) - 1;
+        Object.entries(filters).forEach(([facet, values]) => {
+            const anyOf = new Uint32Array(this.words);
+            values.forEach(value => {
+                const bits = this.bitmap(facet, value);
+                for (let w = 0; w < this.words; w++) anyOf[w] |= bits[w];
+            });
+            for (let w = 0; w < this.words; w++) selection[w] &= anyOf[w];
+        });
+        return selection;
+    }
+
+    /**
+     * Counts every facet value, within `selection` if given, e.g. for the
+     * badges next to each filter option.
+     * @param {Uint32Array} [selection] - A bitset from select().
+     * @returns {Object<string, Map>} {facet: Map(value -> count)}.
+     */
+    counts(selection) {
+        const result = {};
+        Object.entries(this.facets).forEach(([facet, values]) => {
+            if (!selection) {
+                result[facet] = new Map(this.totals[facet]);
+                return;
+            }
+            result[facet] = new Map();
+            values.forEach((bits, value) => {
+                let n = 0;
+                for (let w = 0; w < this.words; w++) n += rqPopcount(bits[w] & selection[w]);
+                result[facet].set(value, n);
+            });
+        });
+        return result;
+    }
+
+    /**
+     * Lists the record indices set in a bitset.
+     * @param {Uint32Array} bits - A bitset.
+     * @returns {number[]}
+     */
+    ordinals(bits) {
+        const result = [];
+        for (let w = 0; w < bits.length; w++) {
+            let word = bits[w];
+            while (word) {
+                const low = word & -word;
+                result.push(w * 32 + 31 - Math.clz32(low));
+                word ^= low;
+            }
+        }
+        return result;
+    }
+}
+
+/**
+ * Fetches and decodes a facet file.
+ * @param {string} url - The .facets file to load.
+ * @returns {Promise<RQFacetIndex>}
+ */
+async function loadFacets(url) {
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`Failed to load ${url}`);
+    return new RQFacetIndex(await res.arrayBuffer());
+}
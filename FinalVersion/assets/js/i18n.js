@@ -15,6 +15,8 @@ class RQPediai18n {
         this.fallbackLocale = fallbackLocale;
         this.translations = {};
         this.languageChangeCallback = null;
+        // Set by scripts/build_locales.py on prerendered pages.
+        this.prerendered = window.RQPEDIA_I18N || null;
 
         this.init();
     }
@@ -30,6 +32,20 @@ class RQPediai18n {
             lang = this.fallbackLocale;
         }
 
+        if (this.prerendered) {
+            // Each locale is a separate static page; switch by navigating.
+            try {
+                localStorage.setItem('rqpedia_lang', lang);
+            } catch (e) {
+                console.warn('Could not save language preference to localStorage.', e);
+            }
+            if (lang !== this.locale) {
+                const page = window.location.pathname.split('/').pop().replace(/\.[a-z]{2}\.html$/, '.html');
+                window.location.href = this.pageUrl(page, lang) + window.location.search + window.location.hash;
+            }
+            return;
+        }
+
         this.locale = lang;
         document.documentElement.lang = lang;
         document.documentElement.dir = lang === 'ar' ? 'rtl' : 'ltr';
@@ -64,6 +80,18 @@ class RQPediai18n {
         return text;
     }
 
+    /**
+     * Get the URL of a page in the current (or given) language.
+     * Prerendered pages link to their localized siblings, e.g. profile.ar.html.
+     * @param {string} page - The page file name (e.g., 'profile.html').
+     * @param {string} [lang] - The language code.
+     * @returns {string} The page URL.
+     */
+    pageUrl(page, lang = this.locale) {
+        if (!this.prerendered) return page;
+        return page.replace(/\.html$/, `.${lang}.html`);
+    }
+
     /**
      * Register a callback to be called when the language changes.
      * @param {function} callback - The function to call.
@@ -80,9 +108,16 @@ class RQPediai18n {
      * @private
      */
     async init() {
-        this.detectLanguage();
-        await this.loadTranslations();
-        this.translatePage();
+        if (this.prerendered) {
+            // Static text is already translated; only runtime strings are needed.
+            this.locale = this.prerendered.locale;
+            this.translations = this.prerendered.translations;
+            this.updateActiveButton();
+        } else {
+            this.detectLanguage();
+            await this.loadTranslations();
+            this.translatePage();
+        }
         this.attachLanguageSwitcherEvents();
 
         // Expose the instance globally
@@ -171,8 +206,10 @@ class RQPediai18n {
             button.addEventListener('click', (e) => {
                 e.preventDefault();
                 const lang = button.getAttribute('data-lang-switcher');
+                if (!this.prerendered) {
+                    this.updateUrlLang(lang);
+                }
                 this.setLanguage(lang);
-                this.updateUrlLang(lang);
             });
         });
     }
@@ -0,0 +1,175 @@
+import argparse
+import hashlib
+import json
+import os
+import unicodedata
+
+# Default paths are resolved from the checkout, not the working directory.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'C14', 'data')
+INPUT_PATH = os.path.join(DATA_DIR, 'output_standardized.geojson')
+DATASET_PATH = os.path.join(DATA_DIR, 'output_compact.geojson')
+# The reference table the pages load, and the inverted index (reference ID to
+# citing features, dates, lab numbers and sites) kept apart from it.
+BIBLIOGRAPHY_PATH = os.path.join(DATA_DIR, 'bibliography.json')
+INDEX_PATH = os.path.join(DATA_DIR, 'reference_index.json')
+
+# Years the sources use for "unknown".
+MISSING_YEARS = {'', 'undefined', 'null', 'none', 'n/a', 'nd', 's.d.'}
+
+
+def _clean(text):
+    return ' '.join(unicodedata.normalize('NFC', str(text)).split())
+
+
+def parse_references(value):
+    """
+    Returns a record's references as a list of {'author', 'year'} dicts.
+    Accepts the list form, the same list stringified as JSON, or free text.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            value = [value]
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+
+    references = []
+    for ref in value:
+        if isinstance(ref, dict):
+            author, year = ref.get('author'), ref.get('year')
+        else:
+            author, year = ref, None
+        author = _clean(author) if author is not None else ''
+        year = _clean(year) if year is not None else ''
+        if year.lower() in MISSING_YEARS:
+            year = ''
+        if author:
+            references.append({'author': author, 'year': year or None})
+    return references
+
+
+def reference_id(ref):
+    """
+    Stable ID of a reference: a hash of its normalised author and year, so IDs
+    do not change when records are added or reordered.
+    """
+    key = f"{ref['author'].casefold()}|{ref['year'] or ''}"
+    return 'ref-' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+
+
+def label(ref):
+    return f"{ref['author']} ({ref['year']})" if ref['year'] else ref['author']
+
+
+def build_bibliography(features):
+    """
+    Deduplicates the references of all features. Returns (references, index,
+    compact features): references maps ID to {'author', 'year', 'label'};
+    index maps ID to the features, dates ([feature, date] pairs), lab numbers
+    and sites citing it; the compact features carry ID lists instead of
+    reference objects.
+    """
+    references = {}
+    index = {}
+    compact = []
+
+    def cite(ref, feature_index, properties, dates):
+        ref_id = reference_id(ref)
+        existing = references.setdefault(ref_id, dict(ref, label=label(ref)))
+        if existing['author'].casefold() != ref['author'].casefold() or existing['year'] != ref['year']:
+            raise ValueError(f"Reference ID collision: {existing['label']!r} and {label(ref)!r}")
+        entry = index.setdefault(ref_id, {'features': set(), 'dates': set(), 'labnrs': set(), 'sites': set()})
+        entry['features'].add(feature_index)
+        entry['dates'].update((feature_index, d) for d in dates)
+        if properties.get('labnr'):
+            entry['labnrs'].add(properties['labnr'])
+        if properties.get('site'):
+            entry['sites'].add(properties['site'])
+        return ref_id
+
+    for feature_index, feature in enumerate(features):
+        properties = dict(feature.get('properties') or {})
+        dates = properties.get('dates') or []
+        ids = []
+        for ref in parse_references(properties.get('references')):
+            ref_id = cite(ref, feature_index, properties, range(len(dates)))
+            if ref_id not in ids:
+                ids.append(ref_id)
+        # Free-text citations on single dates (e.g. Jebel Irhoud) stay as text
+        # for display but are indexed like the rest.
+        for date_index, date in enumerate(dates):
+            for ref in parse_references(date.get('reference')):
+                cite(ref, feature_index, properties, [date_index])
+        if 'references' in properties:
+            properties['references'] = ids
+        compact.append(dict(feature, properties=properties))
+
+    references = dict(sorted(references.items(), key=lambda item: (item[1]['author'].casefold(), item[1]['year'] or '')))
+    index = {ref_id: {'features': sorted(index[ref_id]['features']),
+                      'dates': [list(pair) for pair in sorted(index[ref_id]['dates'])],
+                      'labnrs': sorted(index[ref_id]['labnrs']), 'sites': sorted(index[ref_id]['sites'])}
+             for ref_id in references}
+    return references, index, compact
+
+
+def _write_json(data, path, **kwargs):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def write_bibliography(input_path=INPUT_PATH, dataset_path=DATASET_PATH, bibliography_path=BIBLIOGRAPHY_PATH,
+                       index_path=INDEX_PATH):
+    """
+    Pipeline stage: writes the bibliography table, its inverted index, and a
+    minified copy of the dataset whose records cite references by ID.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    references, index, compact = build_bibliography(data['features'])
+
+    _write_json({'source': os.path.basename(dataset_path), 'references': references},
+                bibliography_path, separators=(',', ':'))
+    _write_json({'source': os.path.basename(dataset_path), 'index': index}, index_path, separators=(',', ':'))
+    _write_json(dict(data, features=compact), dataset_path, separators=(',', ':'))
+    return len(references)
+
+
+def load_bibliography(path=BIBLIOGRAPHY_PATH, index_path=INDEX_PATH):
+    """The reference table, with the inverted index under 'index' when it exists."""
+    with open(path, 'r', encoding='utf-8') as f:
+        bibliography = json.load(f)
+    if index_path and os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            bibliography['index'] = json.load(f)['index']
+    return bibliography
+
+
+def find_references(bibliography, author, year=None):
+    """
+    Returns the IDs of references whose author contains `author` (ignoring
+    case) and, if given, whose year is `year`.
+    """
+    author = _clean(author).casefold()
+    year = str(year) if year is not None else None
+    return [ref_id for ref_id, ref in bibliography['references'].items()
+            if author in ref['author'].casefold() and (year is None or ref['year'] == year)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the bibliography table and reference index.")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--bibliography', default=BIBLIOGRAPHY_PATH)
+    parser.add_argument('--index', default=INDEX_PATH)
+    args = parser.parse_args()
+
+    count = write_bibliography(args.input, args.dataset, args.bibliography, args.index)
+    print(f"Wrote {count} references to {args.bibliography} and {args.dataset}")
@@ -0,0 +1,187 @@
+import argparse
+import html
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+SOURCE_DIR = 'FinalVersion'
+PAGES = ['DataXplorer.html', 'profile.html']
+RTL_LOCALES = {'ar', 'he'}
+FALLBACK_LOCALE = 'en'
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# The source pages redirect visitors to their prerendered copies; the copies
+# themselves must not.
+REDIRECT_PATTERN = re.compile(r'[ \t]*<script data-locale-redirect>.*?</script>\n?', re.DOTALL)
+
+KEY_PATTERN = re.compile(r'data-i18n="([^"]+)"|i18n\.t\(\s*[\'"]([^\'"]+)[\'"]')
+
+
+class MissingTranslationError(Exception):
+    pass
+
+
+class _PageRewriter(HTMLParser):
+    """
+    Collects the text edits needed to render one page in one locale.
+    Markup inside <script> is left untouched; the runtime still translates
+    anything it injects there.
+    """
+
+    def __init__(self, source, translations, locale, pages):
+        super().__init__(convert_charrefs=False)
+        self.source = source
+        self.translations = translations
+        self.locale = locale
+        self.pages = pages
+        self.edits = []
+        self._pending = None
+        self._line_offsets = [0]
+        for line in source.splitlines(keepends=True):
+            self._line_offsets.append(self._line_offsets[-1] + len(line))
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self._line_offsets[line - 1] + column
+
+    def _translate(self, key):
+        if key not in self.translations:
+            raise MissingTranslationError(f"Missing key '{key}' for locale '{self.locale}'")
+        return self.translations[key]
+
+    def handle_starttag(self, tag, attrs):
+        start = self._offset()
+        tag_text = self.get_starttag_text()
+        end = start + len(tag_text)
+        attrs = dict(attrs)
+
+        if self._pending is not None:
+            if tag == self._pending['tag']:
+                self._pending['depth'] += 1
+            return
+
+        new_tag_text = tag_text
+        if tag == 'html':
+            new_tag_text = _set_attr(new_tag_text, 'lang', self.locale)
+            new_tag_text = _set_attr(new_tag_text, 'dir', 'rtl' if self.locale in RTL_LOCALES else 'ltr')
+        elif tag == 'a' and attrs.get('href') in self.pages:
+            new_tag_text = _set_attr(new_tag_text, 'href', localized_name(attrs['href'], self.locale))
+        elif tag == 'button' and attrs.get('data-lang-switcher') == self.locale:
+            classes = (attrs.get('class') or '').split()
+            new_tag_text = _set_attr(new_tag_text, 'class', ' '.join(classes + ['active']))
+
+        key = attrs.get('data-i18n')
+        if key is not None:
+            translation = self._translate(key)
+            if 'placeholder' in attrs:
+                new_tag_text = _set_attr(new_tag_text, 'placeholder', translation)
+            elif tag not in VOID_TAGS and not tag_text.endswith('/>'):
+                self._pending = {'tag': tag, 'depth': 0, 'start': end, 'text': translation}
+
+        if new_tag_text != tag_text:
+            self.edits.append((start, end, new_tag_text))
+
+    def handle_endtag(self, tag):
+        pending = self._pending
+        if pending is None or tag != pending['tag']:
+            return
+        if pending['depth'] > 0:
+            pending['depth'] -= 1
+            return
+        self.edits.append((pending['start'], self._offset(), pending['text']))
+        self._pending = None
+
+    def render(self):
+        self.feed(self.source)
+        self.close()
+        output = self.source
+        for start, end, text in sorted(self.edits, reverse=True):
+            output = output[:start] + text + output[end:]
+        return output
+
+
+def _set_attr(tag_text, name, value):
+    escaped = html.escape(value, quote=True)
+    pattern = re.compile(r'(\s%s\s*=\s*)("[^"]*"|\'[^\']*\'|[^\s>]+)' % re.escape(name))
+    if pattern.search(tag_text):
+        return pattern.sub(lambda m: f'{m.group(1)}"{escaped}"', tag_text, count=1)
+    closing = '/>' if tag_text.endswith('/>') else '>'
+    return f'{tag_text[:-len(closing)].rstrip()} {name}="{escaped}"{closing}'
+
+
+def localized_name(page, locale):
+    """Returns the file name of the prerendered page, e.g. profile.ar.html."""
+    stem, ext = os.path.splitext(page)
+    return f'{stem}.{locale}{ext}'
+
+
+def used_keys(source):
+    """Returns every translation key referenced by the page, markup and scripts alike."""
+    return {a or b for a, b in KEY_PATTERN.findall(source)}
+
+
+def check_keys(source, translations, locale):
+    missing = sorted(k for k in used_keys(source) if k not in translations.get(locale, {}))
+    if missing:
+        raise MissingTranslationError(f"Locale '{locale}' is missing keys: {', '.join(missing)}")
+
+
+def render_page(source, translations, locale, pages=PAGES):
+    """
+    Renders a page for one locale: static [data-i18n] content, placeholders,
+    <html lang/dir> and links between pages are resolved at build time, and
+    the locale's strings are inlined so the runtime does not fetch ui.json.
+    The source page's redirect to its localized copies is left out.
+    """
+    check_keys(source, translations, locale)
+    source = REDIRECT_PATTERN.sub('', source)
+    output = _PageRewriter(source, translations[locale], locale, pages).render()
+
+    inline = {
+        'locale': locale,
+        'translations': {locale: translations[locale]},
+    }
+    if locale != FALLBACK_LOCALE and FALLBACK_LOCALE in translations:
+        inline['translations'][FALLBACK_LOCALE] = translations[FALLBACK_LOCALE]
+    payload = json.dumps(inline, ensure_ascii=False).replace('</', '<\\/')
+    script = f'<script>window.RQPEDIA_I18N = {payload};</script>\n  '
+    marker = '<script src="assets/js/i18n.js"></script>'
+    if marker not in output:
+        raise ValueError("Page does not load assets/js/i18n.js")
+    return output.replace(marker, script + marker, 1)
+
+
+def build_locales(source_dir=SOURCE_DIR, pages=PAGES, locales=None):
+    """
+    Writes one prerendered copy of every page per locale next to the source
+    pages. Returns the list of written paths.
+    """
+    with open(os.path.join(source_dir, 'locales', 'ui.json'), 'r', encoding='utf-8') as f:
+        translations = json.load(f)
+
+    written = []
+    for page in pages:
+        with open(os.path.join(source_dir, page), 'r', encoding='utf-8') as f:
+            source = f.read()
+        for locale in locales or sorted(translations):
+            if locale not in translations:
+                raise MissingTranslationError(f"Locale '{locale}' is not defined in ui.json")
+            output = render_page(source, translations, locale, pages)
+            target = os.path.join(source_dir, localized_name(page, locale))
+            tmp_path = target + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(output)
+            os.replace(tmp_path, target)
+            written.append(target)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prerender localized pages from a single source tree.")
+    parser.add_argument('--source-dir', default=SOURCE_DIR)
+    parser.add_argument('--locale', action='append', dest='locales', help="Locale to build (default: all in ui.json)")
+    args = parser.parse_args()
+
+    for path in build_locales(args.source_dir, locales=args.locales):
+        print(f"Wrote {path}")
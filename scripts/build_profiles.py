@@ -0,0 +1,331 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts import instrument
+
+INPUT_PATH = 'C14/data/output_standardized.geojson'
+OUTPUT_DIR = 'C14/profiles'
+MANIFEST_NAME = '.manifest.json'
+
+# Bump when the page templates change so every page is rebuilt.
+TEMPLATE_VERSION = '1'
+
+PROPERTY_LABELS = {
+    'site': 'Site Name', 'country': 'Country', 'labnr': 'Lab Number', 'site_type': 'Site Type',
+    'material': 'Material', 'species': 'Species', 'delta_c13': 'δ13C', 'lab_name': 'Lab Name',
+    'feature': 'Feature', 'feature_type': 'Feature Type', 'context': 'Context',
+    'source_database': 'Source Database',
+}
+SAMPLE_KEYS = ['labnr', 'site', 'country', 'material', 'species', 'delta_c13', 'lab_name',
+               'feature', 'feature_type', 'context', 'source_database']
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title} - RQpedia C14 Edition</title>
+    <link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&display=swap">
+    <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" integrity="sha256-p4NxAoJBhIIN+hmNHrzRCf9tD/miZyoHS5obTRR9BMY=" crossorigin="" />
+    <link rel="stylesheet" href="{root}assets/css/style.css">
+</head>
+<body>
+    <header class="main-header">
+        <div class="logo">
+            <h1><a href="{root}index.html">RQpedia C14</a></h1>
+        </div>
+        <nav class="main-nav">
+            <a href="{root}explorer.html">Map Explorer</a>
+            <a href="{root}profiles/index.html">All Sites</a>
+        </nav>
+    </header>
+
+    <main class="profile-container">
+{body}
+    </main>
+{scripts}</body>
+</html>
+"""
+
+MAP_SCRIPT = """    <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js" integrity="sha256-20nQCchB9co0qIjJZRGuk2/Z9VM+kNiyxNV1lvTlZBo=" crossorigin=""></script>
+    <script>
+        const map = L.map('profile-map').setView([{lat}, {lng}], 13);
+        L.tileLayer('https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{{z}}/{{y}}/{{x}}', {{
+            attribution: 'Tiles &copy; Esri'
+        }}).addTo(map);
+        L.marker([{lat}, {lng}]).addTo(map);
+    </script>
+"""
+
+
+def slugify(value):
+    """Turns a site name or lab number into a file-system safe name."""
+    value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    value = re.sub(r'[^A-Za-z0-9]+', '-', value).strip('-').lower()
+    return value or 'unnamed'
+
+
+def assign_slugs(keys):
+    """
+    Maps every key to a unique slug. Keys whose slugs collide get a short
+    hash suffix so names stay stable regardless of input order.
+    """
+    by_slug = defaultdict(list)
+    for key in keys:
+        by_slug[slugify(key)].append(key)
+    slugs = {}
+    for slug, group in by_slug.items():
+        for key in group:
+            if len(group) == 1:
+                slugs[key] = slug
+            else:
+                slugs[key] = f"{slug}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:6]}"
+    return slugs
+
+
+def _hash(payload):
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(TEMPLATE_VERSION.encode('utf-8') + data).hexdigest()
+
+
+def _value(raw):
+    if raw is None or raw == '' or raw == 'n/a':
+        return '-'
+    return html.escape(str(raw))
+
+
+def format_reference(ref):
+    """Formats a reference as profile.js does: 'author (year)'."""
+    if isinstance(ref, dict):
+        author = ref.get('author') or ''
+        year = ref.get('year')
+        year = f"({year})" if year and year != 'undefined' else ''
+        return html.escape(f"{author} {year}".strip())
+    return html.escape(str(ref or ''))
+
+
+def _dates(features):
+    """Returns the de-duplicated date entries of a group of features."""
+    seen = {}
+    for feature in features:
+        properties = feature['properties']
+        for date in properties.get('dates') or []:
+            key = (date.get('dating_method'), date.get('age'), date.get('error'), properties.get('labnr'))
+            seen[key] = dict(date, labnr=properties.get('labnr'),
+                             material=date.get('material') or properties.get('material'),
+                             species=properties.get('species'),
+                             references=properties.get('references'))
+    return list(seen.values())
+
+
+def _dates_table(dates, sample_slugs):
+    if not dates:
+        return '<p>No dating evidence found.</p>'
+    rows = []
+    for date in dates:
+        age = '—'
+        if date.get('age'):
+            age = f"{date['age']}{' ± ' + str(date['error']) if date.get('error') else ''} {date.get('unit') or ''}".strip()
+        references = date.get('references')
+        if references:
+            references = ', '.join(format_reference(r) for r in references)
+        else:
+            references = html.escape(date.get('reference') or '—')
+        labnr = date.get('labnr')
+        if labnr in sample_slugs:
+            labnr = f'<a href="../samples/{sample_slugs[labnr]}.html">{html.escape(labnr)}</a>'
+        else:
+            labnr = html.escape(labnr) if labnr else 'N/A'
+        rows.append(
+            f"<tr><td>{html.escape(date.get('dating_method') or '—')}</td><td>{labnr}</td>"
+            f"<td>{html.escape(date.get('material') or '—')}</td><td>{html.escape(date.get('species') or '—')}</td>"
+            f"<td>{html.escape(age)}</td><td>{references}</td></tr>"
+        )
+    return (
+        '<table>\n<thead><tr><th>Method</th><th>Lab ID</th><th>Material</th><th>Taxon</th>'
+        '<th>Age</th><th>References</th></tr></thead>\n<tbody>\n' + '\n'.join(rows) + '\n</tbody>\n</table>'
+    )
+
+
+def _card(title, content):
+    return (f'        <section class="card">\n            <div class="card-content">\n'
+            f'                <h2 class="card-title">{title}</h2>\n{content}\n'
+            f'            </div>\n        </section>')
+
+
+def _coordinates(features):
+    for feature in features:
+        geometry = feature.get('geometry') or {}
+        coordinates = geometry.get('coordinates')
+        if coordinates and len(coordinates) >= 2 and coordinates[0] is not None and coordinates[1] is not None:
+            return float(coordinates[0]), float(coordinates[1])
+    return None
+
+
+def _page(title, root, cards, features):
+    body = [f'        <section class="card">\n            <div class="card-content">\n'
+            f'                <h1 id="profile-site-title" class="card-title">{html.escape(title)}</h1>\n'
+            f'                <div id="profile-map"></div>\n            </div>\n        </section>']
+    body.extend(cards)
+    scripts = ''
+    coordinates = _coordinates(features)
+    if coordinates:
+        scripts = MAP_SCRIPT.format(lng=coordinates[0], lat=coordinates[1])
+    return PAGE_TEMPLATE.format(title=html.escape(title), root=root, body='\n'.join(body), scripts=scripts)
+
+
+def render_site(site, features, sample_slugs):
+    properties = features[0]['properties']
+    info = ''.join(f"<tr><td>{PROPERTY_LABELS[k]}</td><td>{_value(properties.get(k))}</td></tr>"
+                   for k in ('site', 'country', 'site_type'))
+    periods = sorted({p for f in features for p in (f['properties'].get('periods') or []) if p})
+    phasing = ''.join(f'<li>{html.escape(p)}</li>' for p in periods) or '<p>No cultural phasing data available.</p>'
+    if periods:
+        phasing = f'<ul>{phasing}</ul>'
+    cards = [
+        _card('Basic Info', f'<table>{info}</table>'),
+        _card('Relevant Cultural Phasing', phasing),
+        _card('All Dating Evidence from Site', _dates_table(_dates(features), sample_slugs)),
+    ]
+    return _page(site or 'Unnamed Site', '../../', cards, features)
+
+
+def render_sample(labnr, features, site_slugs):
+    properties = features[0]['properties']
+    rows = ''.join(f"<tr><td>{PROPERTY_LABELS[k]}</td><td>{_value(properties.get(k))}</td></tr>"
+                   for k in SAMPLE_KEYS if k in properties)
+    site = properties.get('site')
+    if site in site_slugs:
+        rows += f'<tr><td>Site Profile</td><td><a href="../sites/{site_slugs[site]}.html">{html.escape(site)}</a></td></tr>'
+    references = properties.get('references') or []
+    references = ''.join(f'<p>{format_reference(r)}</p>' for r in references) or '<p>No direct references available.</p>'
+    units = [u for k in ('typochronological_units', 'ecochronological_units') for u in (properties.get(k) or []) if u]
+    units = ''.join(f'<li>{html.escape(u)}</li>' for u in dict.fromkeys(units))
+    cards = [
+        _card('Basic Info', f'<table>{rows}</table>'),
+        _card('Direct References to Radiocarbon Date', references),
+        _card('Cultural Association', f'<ul>{units}</ul>' if units else '<p>-</p>'),
+        _card('Dates', _dates_table(_dates(features), {})),
+    ]
+    return _page(f"{labnr} ({site})" if site else labnr, '../../', cards, features)
+
+
+def render_index(site_slugs, site_counts):
+    items = '\n'.join(
+        f'<li><a href="sites/{site_slugs[site]}.html">{html.escape(site)}</a> ({site_counts[site]})</li>'
+        for site in sorted(site_slugs, key=lambda s: s.lower())
+    )
+    return PAGE_TEMPLATE.format(title='All Sites', root='../', body=_card('All Sites', f'<ul>\n{items}\n</ul>'), scripts='')
+
+
+def _render_job(job):
+    kind, target, args = job
+    if kind == 'site':
+        content = render_site(*args)
+    elif kind == 'sample':
+        content = render_sample(*args)
+    else:
+        content = render_index(*args)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, target)
+    return target
+
+
+def plan_pages(features, output_dir=OUTPUT_DIR):
+    """
+    Groups features into pages. Returns {target path: (content hash, job)};
+    a page's hash covers exactly the features it renders.
+    """
+    sites = defaultdict(list)
+    samples = defaultdict(list)
+    for feature in features:
+        properties = feature.get('properties') or {}
+        if properties.get('site'):
+            sites[properties['site']].append(feature)
+        if properties.get('labnr'):
+            samples[properties['labnr']].append(feature)
+
+    site_slugs = assign_slugs(sites)
+    sample_slugs = assign_slugs(samples)
+
+    pages = {}
+    for site, group in sites.items():
+        # Site pages link to their samples, so the slugs are part of the input.
+        links = sorted({(labnr, sample_slugs[labnr]) for labnr in (f['properties'].get('labnr') for f in group) if labnr})
+        target = os.path.join(output_dir, 'sites', f'{site_slugs[site]}.html')
+        pages[target] = (_hash(['site', site, group, links]), ('site', target, (site, group, sample_slugs)))
+    for labnr, group in samples.items():
+        site = group[0]['properties'].get('site')
+        target = os.path.join(output_dir, 'samples', f'{sample_slugs[labnr]}.html')
+        pages[target] = (_hash(['sample', labnr, group, site_slugs.get(site)]), ('sample', target, (labnr, group, site_slugs)))
+
+    site_counts = {site: len(group) for site, group in sites.items()}
+    target = os.path.join(output_dir, 'index.html')
+    pages[target] = (_hash(['index', site_slugs, site_counts]), ('index', target, (site_slugs, site_counts)))
+    return pages
+
+
+def build_profiles(input_path=INPUT_PATH, output_dir=OUTPUT_DIR, jobs=None, force=False):
+    """
+    Renders static profile pages, rebuilding only those whose inputs changed
+    since the last run and removing pages whose features disappeared.
+    Returns (rebuilt, unchanged, removed) counts.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        features = json.load(f)['features']
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    with instrument.span('profiles.plan', cat='profiles') as args:
+        pages = plan_pages(features, output_dir)
+        todo = [job for target, (digest, job) in pages.items()
+                if manifest.get(target) != digest or not os.path.exists(target)]
+        args['pages'] = len(pages)
+
+    with instrument.span('profiles.render', cat='profiles', pages=len(todo)):
+        if jobs == 1 or len(todo) < 32:
+            for job in todo:
+                _render_job(job)
+        elif todo:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                list(executor.map(_render_job, todo, chunksize=16))
+
+    removed = 0
+    for target in set(manifest) - set(pages):
+        if os.path.exists(target):
+            os.remove(target)
+        removed += 1
+
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({target: digest for target, (digest, _) in pages.items()}, f, indent=0, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+    return len(todo), len(pages) - len(todo), removed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate static site and sample profile pages.")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Rebuild every page")
+    args = parser.parse_args()
+
+    rebuilt, unchanged, removed = build_profiles(args.input, args.output_dir, args.jobs, args.force)
+    print(f"Profiles: {rebuilt} rebuilt, {unchanged} unchanged, {removed} removed -> {args.output_dir}")
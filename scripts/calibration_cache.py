@@ -0,0 +1,110 @@
+import os
+import sqlite3
+from array import array
+from collections import OrderedDict
+
+from scripts import calibration_curves, instrument
+
+DB_PATH = os.path.join(calibration_curves.CACHE_DIR, 'calibrations.sqlite')
+
+# Results kept in memory per process.
+MEMORY_SIZE = 4096
+
+# Misses are written to disk in batches of this size (and on flush/close).
+WRITE_BATCH = 256
+
+# Part of every key; bump when calibrate() changes so old results are ignored.
+ALGORITHM_VERSION = '1'
+
+
+class CalibrationCache:
+    """
+    Memoizes calibration_curves.calibrate() on (curve content hash, bp, std,
+    delta R, delta R error): an in-process LRU in front of an SQLite table
+    that persists across runs. Use as a context manager, or call close(), so
+    pending results reach the disk.
+    """
+
+    def __init__(self, path=DB_PATH, memory_size=MEMORY_SIZE):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._pending = {}
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _db(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS calibrations '
+                               '(key TEXT PRIMARY KEY, years BLOB NOT NULL, probs BLOB NOT NULL)')
+        return self._conn
+
+    @staticmethod
+    def key(curve, bp, std, delta_r=0.0, delta_r_err=0.0):
+        return (f"{ALGORITHM_VERSION}:{curve.digest}:{float(bp)!r}:{float(std)!r}:"
+                f"{float(delta_r)!r}:{float(delta_r_err)!r}")
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def calibrate(self, bp, std, curve, delta_r=0.0, delta_r_err=0.0):
+        """Same arguments and result as calibration_curves.calibrate()."""
+        key = self.key(curve, bp, std, delta_r, delta_r_err)
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            instrument.count('calibration_cache.memory_hits')
+            return result
+
+        # Results evicted from memory before their batch was written count as disk hits.
+        row = self._pending.get(key) or self._db().execute(
+            'SELECT years, probs FROM calibrations WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            result = (array('i', row[0]).tolist(), array('d', row[1]).tolist())
+            self.disk_hits += 1
+            instrument.count('calibration_cache.disk_hits')
+        else:
+            result = calibration_curves.calibrate(bp, std, curve, delta_r, delta_r_err)
+            self._pending[key] = (array('i', result[0]).tobytes(), array('d', result[1]).tobytes())
+            if len(self._pending) >= WRITE_BATCH:
+                self.flush()
+            self.misses += 1
+            instrument.count('calibration_cache.misses')
+        self._remember(key, result)
+        return result
+
+    def flush(self):
+        """Writes pending results to disk."""
+        if self._pending:
+            with self._db() as conn:
+                conn.executemany('INSERT OR IGNORE INTO calibrations VALUES (?, ?, ?)',
+                                 [(key, years, probs) for key, (years, probs) in self._pending.items()])
+            self._pending = {}
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        """Hit counts per tier and the overall hit rate."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0}
@@ -0,0 +1,293 @@
+import bisect
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+
+# Curves and their cache live in the checkout's data directory, whatever the
+# working directory.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'C14', 'data')
+
+# Registry of the calibration curves the pipeline knows about. Only IntCal20
+# ships with the repository; drop marine20.14c / shcal20.14c next to it to
+# enable the other curves.
+CURVES = {
+    'intcal20': os.path.join(DATA_DIR, 'intcal20.14c'),
+    'marine20': os.path.join(DATA_DIR, 'marine20.14c'),
+    'shcal20': os.path.join(DATA_DIR, 'shcal20.14c'),
+}
+
+CACHE_DIR = os.path.join(DATA_DIR, '.curve_cache')
+
+# Local marine reservoir offsets (Delta R, error) applied on top of Marine20.
+# Only a neutral default ships; regional values should be added here from
+# published Marine20 Delta R estimates before relying on marine calibrations.
+RESERVOIR_OFFSETS = {
+    'default': (0.0, 0.0),
+}
+
+# Binary layout: header (with the largest sigma) followed by four
+# little-endian float64 arrays sampled on a 1-year cal BP grid starting at
+# `start`: mean 14C age, sigma, and the running maximum (from the young end)
+# and running minimum (from the old end) of the means that Curve.window()
+# bisects.
+MAGIC = b'RQCURVE2'
+HEADER = struct.Struct('<8s32siid')
+
+# Material keywords used to pick a curve for a sample.
+MARINE_KEYWORDS = ('marine', 'marin', 'sea shell', 'seashell')
+TERRESTRIAL_SHELL_KEYWORDS = ('egg', 'oeuf', 'terrestre', 'land', 'snail', 'escargot', 'schnecken', 'helix')
+SHELL_KEYWORDS = ('shell', 'coquille', 'mollusc', 'molllusc')
+
+
+def parse_14c(path):
+    """
+    Parses a .14c curve file into a list of (cal BP, 14C age, sigma) tuples,
+    sorted by cal BP.
+    """
+    points = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split(',')
+            if len(parts) < 3:
+                continue
+            try:
+                points.append((float(parts[0]), float(parts[1]), float(parts[2])))
+            except ValueError:
+                continue
+    points.sort()
+    return points
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def build_binary(source, target):
+    """
+    Converts a .14c text curve into the binary 1-year grid format.
+    The points are linearly interpolated onto every integer cal BP year.
+    """
+    points = parse_14c(source)
+    if len(points) < 2:
+        raise ValueError(f"Calibration curve {source} has fewer than two points.")
+
+    start = int(math.ceil(points[0][0]))
+    end = int(math.floor(points[-1][0]))
+    count = end - start + 1
+
+    means = []
+    sigmas = []
+    i = 0
+    for year in range(start, end + 1):
+        while points[i + 1][0] < year:
+            i += 1
+        x0, m0, s0 = points[i]
+        x1, m1, s1 = points[i + 1]
+        t = (year - x0) / (x1 - x0) if x1 != x0 else 0.0
+        means.append(m0 + t * (m1 - m0))
+        sigmas.append(s0 + t * (s1 - s0))
+
+    running_max = list(means)
+    running_min = list(means)
+    for i in range(1, count):
+        running_max[i] = max(running_max[i], running_max[i - 1])
+    for i in range(count - 2, -1, -1):
+        running_min[i] = min(running_min[i], running_min[i + 1])
+
+    directory = os.path.dirname(target) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # A private temporary file per writer: workers building the same curve
+    # on a cold cache each replace the target with a complete file.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(target) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, _file_digest(source), start, count, max(sigmas)))
+            for values in (means, sigmas, running_max, running_min):
+                f.write(struct.pack(f'<{count}d', *values))
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class Curve:
+    """
+    A calibration curve backed by a read-only memory map. The mapping is
+    shared through the OS page cache, so worker processes opening the same
+    curve do not each hold a private copy.
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, digest, start, count, max_sigma = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary calibration curve.")
+        self.digest = digest.hex()
+        self.start = start
+        self.count = count
+        self.max_sigma = max_sigma
+        data = memoryview(self._mmap)[HEADER.size:HEADER.size + 32 * count].cast('d')
+        self.means = data[:count]
+        self.sigmas = data[count:2 * count]
+        self._running_max = data[2 * count:3 * count]
+        self._running_min = data[3 * count:]
+
+    @property
+    def end(self):
+        return self.start + self.count - 1
+
+    def at(self, cal_bp):
+        """Returns the (14C age, sigma) of the curve at an integer cal BP year."""
+        index = int(cal_bp) - self.start
+        if index < 0 or index >= self.count:
+            raise IndexError(f"{cal_bp} cal BP is outside the range of {self.name}.")
+        return self.means[index], self.sigmas[index]
+
+    def window(self, low, high):
+        """
+        Returns the index range that can hold curve means within [low, high].
+        The curve is not monotonic, so this bisects a running maximum (from
+        the young end) and running minimum (from the old end) of the means,
+        both stored in the binary file.
+        """
+        return bisect.bisect_left(self._running_max, low), bisect.bisect_right(self._running_min, high)
+
+
+_loaded = {}
+
+
+def register_curve(name, source):
+    """Adds or replaces a curve in the registry."""
+    CURVES[name] = source
+    _loaded.pop(name, None)
+
+
+def load_curve(name, cache_dir=CACHE_DIR):
+    """
+    Returns the memory-mapped curve for `name`, converting the .14c source
+    into the binary cache the first time or whenever the source changes.
+    """
+    if name in _loaded:
+        return _loaded[name]
+    if name not in CURVES:
+        raise KeyError(f"Unknown calibration curve: {name}")
+
+    source = CURVES[name]
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Calibration curve file not found for {name}: {source}")
+
+    target = os.path.join(cache_dir, f'{name}.bin')
+    if not _is_fresh(source, target):
+        build_binary(source, target)
+
+    curve = Curve(name, target)
+    _loaded[name] = curve
+    return curve
+
+
+def _is_fresh(source, target):
+    if not os.path.exists(target):
+        return False
+    with open(target, 'rb') as f:
+        header = f.read(HEADER.size)
+    # Files in an older layout are rebuilt.
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return False
+    if os.path.getmtime(target) < os.path.getmtime(source):
+        # The source may only have been touched; compare content hashes.
+        digest = HEADER.unpack(header)[1]
+        return digest == _file_digest(source)
+    return True
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def select_curve(properties, region='default'):
+    """
+    Picks a calibration curve for a sample from its `material` and
+    `delta_c13` fields. Returns (curve name, Delta R, Delta R error).
+    """
+    material = (properties.get('material') or '').lower()
+    delta_c13 = _to_float(properties.get('delta_c13'))
+    # 0.0 is used as a placeholder for "not measured" throughout the dataset.
+    if delta_c13 == 0.0:
+        delta_c13 = None
+
+    is_marine = False
+    if any(k in material for k in MARINE_KEYWORDS):
+        is_marine = True
+    elif any(k in material for k in SHELL_KEYWORDS) and not any(k in material for k in TERRESTRIAL_SHELL_KEYWORDS):
+        # Ambiguous shell: marine carbonates sit close to 0 per mil, land snail
+        # shells are clearly depleted.
+        is_marine = delta_c13 is not None and delta_c13 > -4.0
+
+    if is_marine:
+        delta_r, delta_r_err = RESERVOIR_OFFSETS.get(region, RESERVOIR_OFFSETS['default'])
+        return 'marine20', delta_r, delta_r_err
+
+    lat = _to_float(properties.get('lat'))
+    if lat is not None and lat < 0:
+        return 'shcal20', 0.0, 0.0
+    return 'intcal20', 0.0, 0.0
+
+
+def calibrate(bp, std, curve, delta_r=0.0, delta_r_err=0.0):
+    """
+    Calculates the calibrated probability distribution of a 14C age.
+    Returns (cal BP years, normalised probabilities), ordered by cal BP.
+    """
+    age = float(bp) - delta_r
+    error_sq = float(std) ** 2 + delta_r_err ** 2
+
+    years = []
+    probs = []
+    total = 0.0
+    means = curve.means
+    sigmas = curve.sigmas
+    # Beyond 5 sigma the contribution is negligible; only scan the part of
+    # the curve that can come that close.
+    reach = 5 * math.sqrt(error_sq + curve.max_sigma ** 2)
+    start, stop = curve.window(age - reach, age + reach)
+    for index in range(start, stop):
+        variance = error_sq + sigmas[index] ** 2
+        if variance == 0:
+            continue
+        z_sq = (age - means[index]) ** 2 / variance
+        if z_sq > 25:
+            continue
+        prob = math.exp(-0.5 * z_sq) / math.sqrt(variance)
+        years.append(curve.start + index)
+        probs.append(prob)
+        total += prob
+
+    if total == 0:
+        return [], []
+    return years, [p / total for p in probs]
+
+
+if __name__ == '__main__':
+    for curve_name in CURVES:
+        try:
+            loaded = load_curve(curve_name)
+        except FileNotFoundError as e:
+            print(f"Skipping {curve_name}: {e}")
+            continue
+        print(f"{curve_name}: {loaded.count} years ({loaded.start}-{loaded.end} cal BP) -> {loaded.path}")
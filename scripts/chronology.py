@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts import calibration_cache, calibration_curves
+
+INPUT_PATH = 'C14/data/output_standardized.geojson'
+OUTPUT_PATH = 'C14/data/chronology.json'
+
+# Probability mass of the reported interval (2 sigma).
+INTERVAL_MASS = 0.954
+INTERVAL_SIGMAS = 2
+
+# Multipliers from a date's `unit` to years.
+UNIT_YEARS = {'bp': 1, 'ka': 1000, 'kyr': 1000, 'ma': 1000000}
+
+# `age`/`error` are the measured age in years (uncalibrated for C14). The
+# cal BP and CE columns are null for C14 dates that could not be calibrated
+# (no curve for the sample, or a distribution running off the curve).
+COLUMNS = ['feature', 'date', 'labnr', 'site', 'method', 'curve', 'calibrated', 'age', 'error',
+           'cal_bp_mid', 'cal_bp_from', 'cal_bp_to', 'cal_bp_ranges', 'ce_mid', 'ce_from', 'ce_to']
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def date_entries(properties):
+    """
+    Returns the date entries of a record. Records that predate the `dates`
+    list only carry bare `bp`/`std`; those become a single C14 entry.
+    """
+    if properties.get('dates'):
+        return properties['dates']
+    if _to_float(properties.get('bp')) is not None:
+        return [{'dating_method': 'C14', 'age': properties['bp'], 'error': properties.get('std'), 'unit': 'BP'}]
+    return []
+
+
+def ce_year(cal_bp):
+    """Converts years BP (before 1950) to a signed CE year, negative for BCE."""
+    return 1950 - cal_bp
+
+
+def hpd_intervals(years, probs, mass=INTERVAL_MASS):
+    """
+    Returns the highest-density region of a calibrated distribution holding
+    `mass`, as [oldest, youngest] cal BP intervals, oldest first. A
+    multimodal distribution gives several intervals.
+    """
+    order = sorted(range(len(probs)), key=probs.__getitem__, reverse=True)
+    total = 0.0
+    included = []
+    for index in order:
+        included.append(years[index])
+        total += probs[index]
+        if total >= mass:
+            break
+    intervals = []
+    # Calibrated years lie on a 1-year grid; a larger step is a gap.
+    for year in sorted(included, reverse=True):
+        if intervals and intervals[-1][1] - year == 1:
+            intervals[-1][1] = year
+        else:
+            intervals.append([year, year])
+    return intervals
+
+
+def hpd_range(years, probs, mass=INTERVAL_MASS):
+    """
+    Returns (median, oldest, youngest) cal BP of a calibrated distribution.
+    The range is the outer envelope of hpd_intervals(): for a multimodal
+    distribution it also spans the gaps between the intervals.
+    """
+    intervals = hpd_intervals(years, probs, mass)
+    cumulative = 0.0
+    median = years[-1]
+    for year, prob in zip(years, probs):
+        cumulative += prob
+        if cumulative >= 0.5:
+            median = year
+            break
+    return median, intervals[0][0], intervals[-1][1]
+
+
+def normalise_date(date, properties, curves, cache=None):
+    """
+    Places one date entry on the common axis. Returns a dict of the numeric
+    columns, or None when the age cannot be interpreted. Calibrations go
+    through `cache` (a CalibrationCache) when given.
+    """
+    age = _to_float(date.get('age'))
+    if age is None:
+        return None
+    error = _to_float(date.get('error')) or 0.0
+    method = date.get('dating_method') or ''
+    unit = (date.get('unit') or 'BP').strip().lower()
+    if unit not in UNIT_YEARS:
+        return None
+    age *= UNIT_YEARS[unit]
+    error *= UNIT_YEARS[unit]
+
+    row = {'method': method, 'curve': None, 'calibrated': False, 'age': age, 'error': error,
+           'cal_bp_mid': None, 'cal_bp_from': None, 'cal_bp_to': None, 'cal_bp_ranges': None}
+    if method.upper() == 'C14':
+        curve_name, delta_r, delta_r_err = calibration_curves.select_curve(properties)
+        if curve_name not in curves:
+            try:
+                curves[curve_name] = calibration_curves.load_curve(curve_name)
+            except FileNotFoundError:
+                # Marine20/SHCal20 are optional; without them the date stays
+                # uncalibrated.
+                curves[curve_name] = None
+        curve = curves[curve_name]
+        if curve is not None and error > 0:
+            calibrate = cache.calibrate if cache is not None else calibration_curves.calibrate
+            years, probs = calibrate(age, error, curve, delta_r, delta_r_err)
+            if years and curve.start < years[0] and years[-1] < curve.end:
+                mid, oldest, youngest = hpd_range(years, probs)
+                row.update(curve=curve_name, calibrated=True, cal_bp_mid=mid, cal_bp_from=oldest,
+                           cal_bp_to=youngest, cal_bp_ranges=hpd_intervals(years, probs))
+    else:
+        # Luminescence, U-series, ESR and AAR ages are already calendar ages.
+        oldest, youngest = age + INTERVAL_SIGMAS * error, age - INTERVAL_SIGMAS * error
+        row.update(cal_bp_mid=age, cal_bp_from=oldest, cal_bp_to=youngest, cal_bp_ranges=[[oldest, youngest]])
+
+    for suffix in ('mid', 'from', 'to'):
+        cal_bp = row[f'cal_bp_{suffix}']
+        row[f'ce_{suffix}'] = ce_year(cal_bp) if cal_bp is not None else None
+    return row
+
+
+def build_chronology(features, start=0, cache=None):
+    """
+    Computes the chronology columns for every date entry of every feature.
+    Returns a dict of equal-length column lists; feature indices count from
+    `start`.
+    """
+    columns = {name: [] for name in COLUMNS}
+    curves = {}
+    for feature_index, feature in enumerate(features, start):
+        properties = feature.get('properties') or {}
+        for date_index, date in enumerate(date_entries(properties)):
+            row = normalise_date(date, properties, curves, cache)
+            if row is None:
+                continue
+            row.update(feature=feature_index, date=date_index,
+                       labnr=properties.get('labnr'), site=properties.get('site'))
+            for name in COLUMNS:
+                columns[name].append(row[name])
+    return columns
+
+
+def _build_chunk(args):
+    features, start, cache_path = args
+    with calibration_cache.CalibrationCache(cache_path) as cache:
+        return build_chronology(features, start, cache), cache.stats()
+
+
+def write_chronology(input_path=INPUT_PATH, output_path=OUTPUT_PATH, jobs=None,
+                     cache_path=calibration_cache.DB_PATH):
+    """
+    Pipeline stage: writes the chronology table for a GeoJSON dataset. With
+    `jobs` > 1 the features are calibrated in that many worker processes.
+    Calibrations are cached at `cache_path` across runs. Returns (rows,
+    cache statistics).
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        features = json.load(f)['features']
+
+    if jobs and jobs > 1 and len(features) > 1:
+        size = -(-len(features) // jobs)
+        chunks = [(features[i:i + size], i, cache_path) for i in range(0, len(features), size)]
+        columns = {name: [] for name in COLUMNS}
+        parts = []
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for part, part_stats in executor.map(_build_chunk, chunks):
+                parts.append(part_stats)
+                for name in COLUMNS:
+                    columns[name].extend(part[name])
+        stats = {key: sum(p[key] for p in parts) for key in ('memory_hits', 'disk_hits', 'misses')}
+        lookups = sum(stats.values())
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+    else:
+        columns, stats = _build_chunk((features, 0, cache_path))
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.basename(input_path), 'columns': columns}, f, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+    return len(columns['feature']), stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Place every date on a common calendar axis.")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: none)")
+    args = parser.parse_args()
+
+    rows, stats = write_chronology(args.input, args.output, args.jobs)
+    print(f"Wrote {rows} dates to {args.output}")
+    print(f"Calibration cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+          f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
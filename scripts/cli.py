@@ -0,0 +1,301 @@
+import argparse
+import os
+import sys
+
+# Only argparse, os and sys are imported here. Each command imports what it
+# needs when it runs, so `rqpedia validate` never pays for pandas, requests
+# or BeautifulSoup.
+
+# Legacy scripts (transform_data.py, C14/standardize_and_merge.py) are not
+# part of the package. They are looked up in the data root (-C/--root, or the
+# current directory), then in the checkout the package was imported from;
+# after a regular `pip install .` that is site-packages, where they are absent.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATASET_PATH = 'C14/data/output_full.geojson'
+STANDARDIZED_PATH = 'C14/data/output_standardized.geojson'
+ENRICHED_PATH = 'C14/data/output_enriched.geojson'
+
+# Stop listing problems of one kind after this many examples.
+MAX_EXAMPLES = 5
+
+
+def _script(relative_path):
+    from scripts.pipeline import load_script
+    for directory in (os.getcwd(), REPO_DIR):
+        path = os.path.join(directory, relative_path)
+        if os.path.exists(path):
+            return load_script(path)
+    raise SystemExit(f"rqpedia: {relative_path} not found in {os.getcwd()}; "
+                     "run from an RQpedia checkout or pass -C/--root")
+
+
+def _load_features(path):
+    import json
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('features'), list):
+        raise ValueError(f"{path} is not a GeoJSON FeatureCollection")
+    return data['features']
+
+
+def _number(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return False
+
+
+def cmd_ingest(args):
+    _script('transform_data.py').main(args.date_table, args.site_table, args.output)
+
+
+def cmd_standardize(args):
+    _script('C14/standardize_and_merge.py').standardize_and_merge(args.input, args.output)
+    print(f"Standardized {args.input} -> {args.output}")
+
+
+def cmd_enrich(args):
+    from scripts import enrich_c14_data
+    enrich_c14_data.enrich_c14_data(args.input, args.input if args.in_place else args.output, args.archive)
+
+
+def cmd_calibrate(args):
+    from scripts import chronology
+    rows, stats = chronology.write_chronology(args.input, args.output, args.jobs)
+    print(f"Wrote {rows} dates to {args.output}")
+    print(f"Calibration cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+          f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+
+
+def check_features(features):
+    """
+    Checks records for the problems the front ends trip over. Returns
+    {problem: [feature indices]}; an empty dict means the data is valid.
+    """
+    problems = {}
+
+    def report(problem, index):
+        problems.setdefault(problem, []).append(index)
+
+    for index, feature in enumerate(features):
+        if not isinstance(feature, dict) or not isinstance(feature.get('properties'), dict):
+            report('feature without properties', index)
+            continue
+        properties = feature['properties']
+        geometry = feature.get('geometry')
+        if not geometry or geometry.get('type') != 'Point':
+            report('missing point geometry', index)
+        else:
+            coordinates = geometry.get('coordinates') or []
+            if (len(coordinates) != 2 or not all(isinstance(c, (int, float)) for c in coordinates)
+                    or not -180 <= coordinates[0] <= 180 or not -90 <= coordinates[1] <= 90):
+                report('invalid coordinates', index)
+        if not properties.get('site'):
+            report('missing site', index)
+        for name in ('bp', 'std'):
+            if _number(properties.get(name)) is False:
+                report(f'non-numeric {name}', index)
+        for date in properties.get('dates') or []:
+            if _number(date.get('age')) is False or _number(date.get('error')) is False:
+                report('non-numeric date age or error', index)
+                break
+    return problems
+
+
+def cmd_validate(args):
+    features = _load_features(args.path)
+    problems = check_features(features)
+    print(f"{args.path}: {len(features)} features")
+    for problem, indices in sorted(problems.items()):
+        examples = ', '.join(str(i) for i in indices[:MAX_EXAMPLES])
+        more = ', ...' if len(indices) > MAX_EXAMPLES else ''
+        print(f"  {problem}: {len(indices)} (features {examples}{more})")
+    if problems:
+        return 1
+    print("  no problems found")
+    return 0
+
+
+def cmd_stats(args):
+    features = _load_features(args.path)
+    sites, countries, labnrs, methods = set(), set(), set(), {}
+    ages = []
+    for feature in features:
+        properties = feature.get('properties') or {}
+        sites.add(properties.get('site'))
+        countries.add(properties.get('country'))
+        if properties.get('labnr'):
+            labnrs.add(properties['labnr'])
+        dates = properties.get('dates') or [{'dating_method': 'C14', 'age': properties.get('bp')}]
+        for date in dates:
+            age = _number(date.get('age'))
+            if age:
+                method = date.get('dating_method') or 'unknown'
+                methods[method] = methods.get(method, 0) + 1
+                if method.upper() == 'C14':
+                    ages.append(age)
+    print(f"Features:  {len(features)}")
+    print(f"Sites:     {len(sites - {None, ''})}")
+    print(f"Countries: {len(countries - {None, ''})}")
+    print(f"Lab codes: {len(labnrs)}")
+    for method, count in sorted(methods.items(), key=lambda item: -item[1]):
+        print(f"  {method}: {count} dates")
+    if ages:
+        print(f"C14 ages:  {min(ages):.0f}-{max(ages):.0f} BP")
+
+
+def cmd_lookup(args):
+    import json
+    from scripts.feature_index import FeatureIndex
+    with FeatureIndex(args.file) as index:
+        if args.to is not None:
+            features = [feature for _, feature in index.range(args.field, args.key, args.to)]
+        else:
+            features = index.get(args.field, args.key)
+    print(json.dumps(features, indent=2, ensure_ascii=False))
+    return 0 if features else 1
+
+
+def cmd_regions(args):
+    from scripts import regions
+    summary = regions.write_regions(args.input, args.output, args.boundaries)
+    print(f"Wrote {args.output}")
+    for flag, count in sorted(summary.items()):
+        print(f"  {flag}: {count}")
+    return 1 if args.strict and summary else 0
+
+
+def cmd_publish(args):
+    from scripts import bibliography, build_locales, build_profiles, export_columnar, facets, stats_cube
+    count = bibliography.write_bibliography(args.input, args.compact, args.bibliography, args.reference_index)
+    print(f"Wrote {count} references to {args.bibliography} and {args.compact}")
+    count = stats_cube.write_cube(args.input, args.stats_cube)
+    print(f"Wrote {count} statistics cells to {args.stats_cube}")
+    rebuilt, unchanged, removed = build_profiles.build_profiles(args.input, args.profiles_dir, args.jobs, args.force)
+    print(f"Profiles: {rebuilt} rebuilt, {unchanged} unchanged, {removed} removed -> {args.profiles_dir}")
+    size = export_columnar.write_columnar(args.dataset, args.columnar)
+    print(f"Wrote {args.columnar} ({size:,} bytes)")
+    count = facets.write_facets(args.dataset, args.facets)
+    print(f"Wrote {count} facet values to {args.facets}")
+    written = build_locales.build_locales(args.site_dir)
+    print(f"Wrote {len(written)} localized pages to {args.site_dir}")
+
+
+def cmd_store(args):
+    from scripts import store
+    if args.action == 'import':
+        count = store.import_geojson(args.geojson or STANDARDIZED_PATH, args.db)
+        print(f"Merged {count} new or changed records into {args.db}")
+    else:
+        count = store.export_geojson(args.db, args.geojson or STANDARDIZED_PATH)
+        print(f"Exported {count} records to {args.geojson or STANDARDIZED_PATH}")
+
+
+def cmd_serve(args):
+    import functools
+    import http.server
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=args.directory)
+    with http.server.ThreadingHTTPServer((args.bind, args.port), handler) as server:
+        print(f"Serving {args.directory} at http://{args.bind}:{args.port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='rqpedia', description="RQpedia data pipeline and site tools.")
+    parser.add_argument('-C', '--root', default=None,
+                        help="Directory the data paths are relative to (default: current directory)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Worker processes for commands that parallelise (calibrate, publish)")
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Convert the date and site tables to GeoJSON")
+    ingest.add_argument('--date-table', default='dateTable.csv')
+    ingest.add_argument('--site-table', default='siteTable.csv')
+    ingest.add_argument('--output', default='new_data.json')
+    ingest.set_defaults(func=cmd_ingest)
+
+    standardize = commands.add_parser('standardize', help="Move dates into the standardized `dates` lists")
+    standardize.add_argument('--input', default=DATASET_PATH)
+    standardize.add_argument('--output', default=STANDARDIZED_PATH)
+    standardize.set_defaults(func=cmd_standardize)
+
+    enrich = commands.add_parser('enrich', help="Add MedAfriCarbon fields to a copy of the standardized dataset "
+                                                "(merge it with `store import --geojson`)")
+    enrich.add_argument('--input', default=STANDARDIZED_PATH)
+    target = enrich.add_mutually_exclusive_group()
+    target.add_argument('--output', default=ENRICHED_PATH)
+    target.add_argument('--in-place', action='store_true', help="Overwrite the input instead of writing --output")
+    enrich.add_argument('--archive', default=None, help="Local MedAfriCarbon zip (default: download it)")
+    enrich.set_defaults(func=cmd_enrich)
+
+    calibrate = commands.add_parser('calibrate', help="Place every date on a common calendar axis")
+    calibrate.add_argument('--input', default=STANDARDIZED_PATH)
+    calibrate.add_argument('--output', default='C14/data/chronology.json')
+    calibrate.set_defaults(func=cmd_calibrate)
+
+    validate = commands.add_parser('validate', help="Check a GeoJSON dataset for malformed records")
+    validate.add_argument('path', nargs='?', default=DATASET_PATH)
+    validate.set_defaults(func=cmd_validate)
+
+    stats = commands.add_parser('stats', help="Summarise a GeoJSON dataset")
+    stats.add_argument('path', nargs='?', default=DATASET_PATH)
+    stats.set_defaults(func=cmd_stats)
+
+    lookup = commands.add_parser('lookup', help="Print features by lab number or id without loading the whole file")
+    lookup.add_argument('key', help="Key to look up, or the start of a range with --to")
+    lookup.add_argument('--to', default=None, help="Return every key from KEY up to (not including) this one")
+    lookup.add_argument('--field', default='labnr', choices=['labnr', 'id'])
+    lookup.add_argument('--file', default=DATASET_PATH)
+    lookup.set_defaults(func=cmd_lookup)
+
+    regions = commands.add_parser('regions', help="Assign country and region from boundary polygons; flag suspect coordinates")
+    regions.add_argument('--input', default=STANDARDIZED_PATH)
+    regions.add_argument('--output', default='C14/data/regions.json')
+    regions.add_argument('--boundaries', default='C14/data/boundaries.geojson',
+                         help="Admin boundary polygons, e.g. Natural Earth admin-1 as GeoJSON")
+    regions.add_argument('--strict', action='store_true', help="Exit with status 1 when any coordinate is flagged")
+    regions.set_defaults(func=cmd_regions)
+
+    publish = commands.add_parser('publish', help="Build the bibliography, statistics, profiles, columnar dataset, facets and localized pages")
+    publish.add_argument('--input', default=STANDARDIZED_PATH, help="Dataset for the bibliography, statistics and profile pages")
+    publish.add_argument('--compact', default='C14/data/output_compact.geojson')
+    publish.add_argument('--bibliography', default='C14/data/bibliography.json')
+    publish.add_argument('--reference-index', default='C14/data/reference_index.json')
+    publish.add_argument('--stats-cube', default='C14/data/stats_cube.json')
+    publish.add_argument('--profiles-dir', default='C14/profiles')
+    publish.add_argument('--dataset', default='FinalVersion/output_full.geojson', help="Dataset for DataXplorer")
+    publish.add_argument('--columnar', default='FinalVersion/output_full.rqc')
+    publish.add_argument('--facets', default='FinalVersion/output_full.facets')
+    publish.add_argument('--site-dir', default='FinalVersion')
+    publish.add_argument('--force', action='store_true', help="Rebuild every profile page")
+    publish.set_defaults(func=cmd_publish)
+
+    store = commands.add_parser('store', help="Merge a GeoJSON dataset into the SQLite store, or export the store to GeoJSON")
+    store.add_argument('action', choices=['import', 'export'])
+    store.add_argument('--db', default='C14/data/rqpedia.sqlite')
+    store.add_argument('--geojson', default=None, help=f"Default: {STANDARDIZED_PATH}")
+    store.set_defaults(func=cmd_store)
+
+    serve = commands.add_parser('serve', help="Serve the site locally")
+    serve.add_argument('--directory', default='FinalVersion')
+    serve.add_argument('--bind', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.root:
+        os.chdir(args.root)
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,51 +2,72 @@ import json
 import pandas as pd
 import requests
 import zipfile
-import io
 import os
+import shutil
+import tempfile
 
-def enrich_c14_data():
+MEDAFRICARBON_URL = "https://zenodo.org/records/3689716/files/data_v1.0.3.zip"
+
+def download_medafricarbon(archive_path):
+    """
+    Downloads the MedAfriCarbon archive from Zenodo to `archive_path`.
+    """
+    print("Downloading MedAfriCarbon data from Zenodo...")
+    r = requests.get(MEDAFRICARBON_URL)
+    r.raise_for_status()
+    os.makedirs(os.path.dirname(archive_path) or '.', exist_ok=True)
+    tmp_path = archive_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(r.content)
+    os.replace(tmp_path, archive_path)
+
+def enrich_c14_data(geojson_path='C14/data/output_standardized.geojson',
+                    output_path='C14/data/output_enriched.geojson', archive_path=None):
     """
     Enriches the C14/data/output_standardized.geojson file with data from the
     MedAfriCarbon dataset from Zenodo.
+
+    The result is written to `output_path`; pass `geojson_path` itself to
+    update the input in place.
+    When `archive_path` is given, the previously downloaded archive is used
+    instead of fetching it again. Download errors and unusable archives are
+    raised, so a failed run never leaves an old output looking current.
     """
     print("Starting data enrichment...")
 
     # --- Download and Extract ---
-    print("Downloading MedAfriCarbon data from Zenodo...")
-    url = "https://zenodo.org/records/3689716/files/data_v1.0.3.zip"
-    try:
-        r = requests.get(url)
-        r.raise_for_status()
-        z = zipfile.ZipFile(io.BytesIO(r.content))
-    except requests.exceptions.RequestException as e:
-        print(f"Error downloading data: {e}")
-        return
+    download_dir = None
+    if not archive_path:
+        download_dir = tempfile.mkdtemp()
+        archive_path = os.path.join(download_dir, 'medafricarbon.zip')
 
     # --- Process Data ---
-    print("Processing downloaded data...")
     try:
-        with z.open('siteTable.csv') as site_file:
-            site_table = pd.read_csv(site_file, dtype=str)
-        with z.open('dateTable.csv') as date_file:
-            date_table = pd.read_csv(date_file, dtype=str)
+        if download_dir:
+            download_medafricarbon(archive_path)
+        print("Processing downloaded data...")
+        with zipfile.ZipFile(archive_path) as z:
+            with z.open('siteTable.csv') as site_file:
+                site_table = pd.read_csv(site_file, dtype=str)
+            with z.open('dateTable.csv') as date_file:
+                date_table = pd.read_csv(date_file, dtype=str)
     except KeyError as e:
-        print(f"Error: A required file was not found in the zip archive: {e}")
-        return
+        raise ValueError(f"A required file was not found in the MedAfriCarbon archive: {e}") from e
+    finally:
+        if download_dir:
+            shutil.rmtree(download_dir, ignore_errors=True)
 
     # Filter for sites in Morocco and Western Sahara
     morocco_sites = site_table[site_table['Country'].isin(['MA', 'EH'])]
 
     if morocco_sites.empty:
-        print("No sites found for Morocco or Western Sahara in the dataset.")
-        return
+        raise ValueError("No sites found for Morocco or Western Sahara in the MedAfriCarbon dataset.")
 
     # Merge date and site tables
     merged_data = pd.merge(date_table, morocco_sites, on='Site_ID')
 
     # --- Merge into GeoJSON ---
-    print("Merging data into C14/data/output_standardized.geojson...")
-    geojson_path = 'C14/data/output_standardized.geojson'
+    print(f"Merging data into {output_path}...")
     with open(geojson_path, 'r') as f:
         geojson_data = json.load(f)
 
@@ -126,8 +147,11 @@ def enrich_c14_data():
             }
             geojson_data['features'].append(new_feature)
 
-    with open(geojson_path, 'w') as f:
+    # Write atomically so a crash mid-write never corrupts the dataset.
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(geojson_data, f, indent=2)
+    os.replace(tmp_path, output_path)
 
     print("\n--- Enrichment Report ---")
     print(f"New sites added: {len(new_sites)}")
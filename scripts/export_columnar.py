@@ -0,0 +1,238 @@
+import argparse
+import json
+import math
+import os
+import struct
+from array import array
+
+INPUT_PATH = 'FinalVersion/output_full.geojson'
+OUTPUT_PATH = 'FinalVersion/output_full.rqc'
+
+# Container layout (all integers little-endian):
+#   8 bytes   magic
+#   uint32    length of the JSON header in bytes
+#   header    UTF-8 JSON, space padded so the body starts 8-byte aligned
+#   body      typed arrays, each at an 8-byte aligned offset from body start
+# The header lists the property columns under 'columns' and the geometry under
+# 'geometry' (lon/lat for points, otherwise one dictionary column), so a
+# property named 'lat' or 'geometry' never shadows the geometry. See
+# FinalVersion/assets/js/columnar.js.
+MAGIC = b'RQCOL001'
+VERSION = 2
+ALIGN = 8
+
+_MISSING = object()
+
+
+def _number_text(value):
+    """
+    Formats a float the way the JS decoder rebuilds numeric strings, which
+    matches Python's repr for the values we accept (e.g. '3490.0').
+    """
+    if value.is_integer() and abs(value) < 1e15:
+        return f'{value:.1f}'
+    return repr(value)
+
+
+def _numeric(values):
+    """
+    Returns (float array, missing marker, as_string) when every value is a
+    number, or a numeric string the decoders rebuild exactly, apart from a
+    single kind of missing marker ('' or None). Returns None otherwise.
+    """
+    numbers = array('d')
+    missing = _MISSING
+    kinds = set()
+    for value in values:
+        if value is None or value == '':
+            if missing is not _MISSING and missing != value:
+                return None
+            missing = value
+            numbers.append(math.nan)
+            continue
+        if isinstance(value, str):
+            try:
+                number = float(value)
+            except ValueError:
+                return None
+            # JS and Python only agree on the text of integers below 1e15 and
+            # of non-integers from 1e-4 up.
+            if abs(number) >= 1e15 or not (number.is_integer() or abs(number) >= 1e-4) \
+                    or _number_text(number) != value:
+                return None
+            kinds.add('string')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            number = float(value)
+            kinds.add('number')
+        else:
+            return None
+        if not math.isfinite(number):
+            return None
+        numbers.append(number)
+    if len(kinds) != 1:
+        return None
+    return numbers, (None if missing is _MISSING else missing), kinds == {'string'}
+
+
+def _codes_dtype(size):
+    if size <= 0xFF:
+        return 'uint8', 'B'
+    if size <= 0xFFFF:
+        return 'uint16', 'H'
+    return 'uint32', 'I'
+
+
+def _dictionary(values):
+    """Dictionary-encodes arbitrary JSON values by their canonical form."""
+    index = {}
+    dictionary = []
+    codes = []
+    absent = None
+    for value in values:
+        if value is _MISSING:
+            if absent is None:
+                absent = len(dictionary)
+                dictionary.append(None)
+            codes.append(absent)
+            continue
+        key = json.dumps(value, sort_keys=True, ensure_ascii=False)
+        if key not in index:
+            index[key] = len(dictionary)
+            dictionary.append(value)
+        codes.append(index[key])
+    dtype, typecode = _codes_dtype(len(dictionary))
+    return array(typecode, codes), dtype, dictionary, absent
+
+
+def encode(features):
+    """
+    Encodes features column by column. Returns (property column
+    descriptions, geometry column descriptions, arrays) with one array per
+    column, property columns first.
+    """
+    names = []
+    for feature in features:
+        for name in feature.get('properties') or {}:
+            if name not in names:
+                names.append(name)
+
+    columns = []
+    arrays = []
+    for name in names:
+        values = [(f.get('properties') or {}).get(name, _MISSING) for f in features]
+        numeric = _numeric(values)
+        if numeric is not None and not any(v is _MISSING for v in values):
+            numbers, missing, as_string = numeric
+            columns.append({'name': name, 'type': 'number', 'dtype': 'float64',
+                            'missing': missing, 'string': as_string})
+            arrays.append(numbers)
+        else:
+            codes, dtype, dictionary, absent = _dictionary(values)
+            columns.append({'name': name, 'type': 'dict', 'dtype': dtype,
+                            'dictionary': dictionary, 'absent': absent})
+            arrays.append(codes)
+
+    geometry = []
+    geometries = [f.get('geometry') for f in features]
+    if all(g is None or (g.get('type') == 'Point' and len(g.get('coordinates') or []) == 2) for g in geometries):
+        for axis, name in ((0, 'lon'), (1, 'lat')):
+            geometry.append({'name': name, 'type': 'coordinate', 'dtype': 'float64'})
+            arrays.append(array('d', (math.nan if g is None else float(g['coordinates'][axis]) for g in geometries)))
+    else:
+        codes, dtype, dictionary, absent = _dictionary(geometries)
+        geometry.append({'name': 'geometry', 'type': 'dict', 'dtype': dtype,
+                         'dictionary': dictionary, 'absent': absent})
+        arrays.append(codes)
+    return columns, geometry, arrays
+
+
+def write_columnar(input_path=INPUT_PATH, output_path=OUTPUT_PATH):
+    """Pipeline stage: writes the columnar container for a GeoJSON file."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        features = json.load(f)['features']
+
+    columns, geometry, arrays = encode(features)
+
+    body = bytearray()
+    for column, values in zip(columns + geometry, arrays):
+        body.extend(b'\0' * (-len(body) % ALIGN))
+        column['offset'] = len(body)
+        if values.itemsize > 1 and struct.pack('=H', 1) != struct.pack('<H', 1):
+            values = array(values.typecode, values)
+            values.byteswap()
+        body.extend(values.tobytes())
+
+    header = json.dumps({'version': VERSION, 'length': len(features), 'columns': columns, 'geometry': geometry},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % ALIGN)
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, output_path)
+    return os.path.getsize(output_path)
+
+
+def read_columnar(path):
+    """
+    Decodes a container back into GeoJSON features; the Python counterpart
+    of the JS decoder, used to check exports.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a columnar RQpedia file.")
+    header_length, = struct.unpack_from('<I', data, len(MAGIC))
+    body_start = len(MAGIC) + 4 + header_length
+    header = json.loads(data[len(MAGIC) + 4:body_start])
+    if header.get('version') != VERSION:
+        raise ValueError(f"{path} uses an unsupported columnar version; re-export it.")
+    length = header['length']
+
+    typecodes = {'uint8': 'B', 'uint16': 'H', 'uint32': 'I', 'float64': 'd'}
+
+    def column_values(column):
+        values = array(typecodes[column['dtype']])
+        start = body_start + column['offset']
+        values.frombytes(data[start:start + values.itemsize * length])
+        if struct.pack('=H', 1) != struct.pack('<H', 1):
+            values.byteswap()
+        return values
+
+    def decode(column, value):
+        if column['type'] == 'number':
+            if math.isnan(value):
+                return column['missing']
+            return _number_text(value) if column['string'] else value
+        return _MISSING if value == column['absent'] else column['dictionary'][value]
+
+    features = [{'type': 'Feature', 'properties': {}, 'geometry': None} for _ in range(length)]
+    for column in header['columns']:
+        for feature, value in zip(features, column_values(column)):
+            value = decode(column, value)
+            if value is not _MISSING:
+                feature['properties'][column['name']] = value
+
+    geometry = {column['name']: column for column in header['geometry']}
+    if 'lon' in geometry:
+        for feature, lon, lat in zip(features, column_values(geometry['lon']), column_values(geometry['lat'])):
+            if not math.isnan(lon):
+                feature['geometry'] = {'type': 'Point', 'coordinates': [lon, lat]}
+    else:
+        for feature, value in zip(features, column_values(geometry['geometry'])):
+            value = decode(geometry['geometry'], value)
+            feature['geometry'] = None if value is _MISSING else value
+    return features
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export a GeoJSON dataset to the columnar browser format.")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    size = write_columnar(args.input, args.output)
+    print(f"Wrote {args.output} ({size:,} bytes, from {os.path.getsize(args.input):,})")
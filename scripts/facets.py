@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import struct
+from array import array
+
+INPUT_PATH = 'FinalVersion/output_full.geojson'
+OUTPUT_PATH = 'FinalVersion/output_full.facets'
+
+# Properties indexed as facets. List-valued properties set one bit per value.
+FACETS = ['material', 'periods', 'typochronological_units', 'site_type', 'country']
+
+# Same container layout as scripts/export_columnar.py, with its own magic:
+# magic, uint32 header length, JSON header padded to 8 bytes, aligned body.
+# Record ordinals are feature positions in the input, so they line up with
+# the rows of the columnar export of the same file.
+MAGIC = b'RQFACET1'
+ALIGN = 8
+
+
+def _values(value):
+    values = value if isinstance(value, list) else [value]
+    seen = []
+    for v in values:
+        if v is not None and v != '' and v not in seen:
+            seen.append(v)
+    return seen
+
+
+def _runs(ordinals):
+    runs = []
+    for ordinal in ordinals:
+        if runs and runs[-1][0] + runs[-1][1] == ordinal:
+            runs[-1][1] += 1
+        else:
+            runs.append([ordinal, 1])
+    return runs
+
+
+def encode_bitmap(ordinals, length):
+    """
+    Picks the smallest encoding of a sorted ordinal list: the ordinals
+    themselves ('array'), (start, length) pairs ('runs') or a plain bitset
+    of uint32 words ('bitmap'). Returns (encoding, array).
+    """
+    typecode = 'H' if length <= 0x10000 else 'I'
+    runs = _runs(ordinals)
+    words = (length + 31) // 32
+    width = array(typecode).itemsize
+    sizes = {'array': len(ordinals) * width, 'runs': 2 * len(runs) * width, 'bitmap': words * 4}
+    encoding = min(sizes, key=lambda name: (sizes[name], name != 'array'))
+
+    if encoding == 'array':
+        return encoding, array(typecode, ordinals)
+    if encoding == 'runs':
+        return encoding, array(typecode, [n for run in runs for n in run])
+    bits = array('I', bytes(words * 4))
+    for ordinal in ordinals:
+        bits[ordinal >> 5] |= 1 << (ordinal & 31)
+    return encoding, bits
+
+
+def build_facets(features, facets=FACETS):
+    """Returns {facet: {value: sorted record ordinals}}."""
+    index = {facet: {} for facet in facets}
+    for ordinal, feature in enumerate(features):
+        properties = feature.get('properties') or {}
+        for facet in facets:
+            for value in _values(properties.get(facet)):
+                index[facet].setdefault(value, []).append(ordinal)
+    return index
+
+
+def write_facets(input_path=INPUT_PATH, output_path=OUTPUT_PATH, facets=FACETS):
+    """Pipeline stage: writes the facet bitmaps and counts for a GeoJSON file."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        features = json.load(f)['features']
+    length = len(features)
+    index = build_facets(features, facets)
+
+    header = {'version': 1, 'length': length, 'facets': {}}
+    body = bytearray()
+    for facet, values in index.items():
+        entries = []
+        # Most frequent first, which is also the order badges are shown in.
+        for value, ordinals in sorted(values.items(), key=lambda item: (-len(item[1]), str(item[0]))):
+            encoding, data = encode_bitmap(ordinals, length)
+            body.extend(b'\0' * (-len(body) % ALIGN))
+            if data.itemsize > 1 and struct.pack('=H', 1) != struct.pack('<H', 1):
+                data.byteswap()
+            entries.append({'value': value, 'count': len(ordinals), 'encoding': encoding,
+                            'dtype': 'uint16' if data.typecode == 'H' else 'uint32',
+                            'offset': len(body), 'size': len(data)})
+            body.extend(data.tobytes())
+        header['facets'][facet] = entries
+
+    header = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % ALIGN)
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, output_path)
+    return sum(len(values) for values in index.values())
+
+
+class FacetIndex:
+    """
+    Reads a facet file. Bitmaps are Python ints with bit i set for record
+    ordinal i, so `&`, `|` and `~` combine them directly.
+    """
+
+    def __init__(self, path=OUTPUT_PATH):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an RQpedia facet file.")
+        header_length, = struct.unpack_from('<I', data, len(MAGIC))
+        body_start = len(MAGIC) + 4 + header_length
+        header = json.loads(data[len(MAGIC) + 4:body_start])
+
+        self.length = header['length']
+        self.all = (1 << self.length) - 1
+        self.facets = {}
+        self.counts = {}
+        for facet, entries in header['facets'].items():
+            self.facets[facet] = {}
+            self.counts[facet] = {}
+            for entry in entries:
+                typecode = 'H' if entry['dtype'] == 'uint16' else 'I'
+                start = body_start + entry['offset']
+                raw = data[start:start + array(typecode).itemsize * entry['size']]
+                self.facets[facet][entry['value']] = self._decode(entry['encoding'], typecode, raw)
+                self.counts[facet][entry['value']] = entry['count']
+
+    def _decode(self, encoding, typecode, raw):
+        if encoding == 'bitmap':
+            # Little-endian uint32 words are the bitset's bytes in order.
+            return int.from_bytes(raw, 'little')
+        values = array(typecode, raw)
+        if struct.pack('=H', 1) != struct.pack('<H', 1):
+            values.byteswap()
+        if encoding == 'array':
+            ordinals = values
+        else:
+            ordinals = (start + i for start, n in zip(values[::2], values[1::2]) for i in range(n))
+        bits = bytearray((self.length + 7) // 8)
+        for ordinal in ordinals:
+            bits[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(bits, 'little')
+
+    def bitmap(self, facet, value):
+        return self.facets[facet].get(value, 0)
+
+    def select(self, filters):
+        """
+        Returns the bitmap of records matching `filters`, {facet: [values]}:
+        values of one facet are OR-ed, facets are AND-ed.
+        """
+        selection = self.all
+        for facet, values in filters.items():
+            any_of = 0
+            for value in values:
+                any_of |= self.bitmap(facet, value)
+            selection &= any_of
+        return selection
+
+    def facet_counts(self, selection=None):
+        """
+        Counts every facet value within `selection` (default: all records),
+        e.g. for the badges next to each filter option.
+        """
+        if selection is None or selection == self.all:
+            return {facet: dict(counts) for facet, counts in self.counts.items()}
+        return {facet: {value: bin(bits & selection).count('1') for value, bits in values.items()}
+                for facet, values in self.facets.items()}
+
+    @staticmethod
+    def ordinals(bitmap):
+        """Lists the record ordinals set in a bitmap."""
+        result = []
+        for index, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')):
+            while byte:
+                low = byte & -byte
+                result.append(index * 8 + low.bit_length() - 1)
+                byte ^= low
+        return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build facet bitmaps for a GeoJSON dataset.")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    count = write_facets(args.input, args.output)
+    print(f"Wrote {count} facet values to {args.output} ({os.path.getsize(args.output):,} bytes)")
@@ -0,0 +1,237 @@
+import argparse
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+# Property fields indexed by default.
+KEY_FIELDS = ['labnr', 'id']
+
+# Sidecar written next to the GeoJSON file (`<file>.idx`), in the container
+# layout of scripts/export_columnar.py: magic, uint32 header length, JSON
+# header padded to 8 bytes, then 8-byte aligned arrays in native byte order.
+MAGIC = b'RQFIDX01'
+ALIGN = 8
+SUFFIX = '.idx'
+
+# A complete JSON string literal, or a single bracket. Skipping whole strings
+# keeps brackets inside values from being counted; multi-byte UTF-8 never
+# contains these ASCII bytes.
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.DOTALL)
+
+
+def feature_spans(data):
+    """
+    Yields (start, end) byte offsets of each feature object in a GeoJSON
+    FeatureCollection, scanning brackets without parsing values.
+    """
+    depth = 0
+    last_key = None
+    features_depth = None
+    start = None
+    for match in _TOKEN.finditer(data):
+        token = match.group()
+        if token[0] == 0x22:  # '"'
+            if depth == 1:
+                last_key = token
+            continue
+        if token in (b'{', b'['):
+            depth += 1
+            if token == b'[' and depth == 2 and last_key == b'"features"':
+                features_depth = depth
+            elif token == b'{' and features_depth is not None and depth == features_depth + 1:
+                start = match.start()
+        else:
+            if token == b'}' and features_depth is not None and depth == features_depth + 1:
+                yield start, match.end()
+            elif token == b']' and depth == features_depth:
+                features_depth = None
+            depth -= 1
+
+
+def index_path_for(geojson_path):
+    return geojson_path + SUFFIX
+
+
+def build_index(geojson_path, index_path=None, keys=KEY_FIELDS):
+    """
+    Writes the sidecar for a GeoJSON file: every feature's byte span and,
+    per key field, the keys sorted with their feature ordinals. Returns the
+    number of features.
+    """
+    index_path = index_path or index_path_for(geojson_path)
+    stat = os.stat(geojson_path)
+    with open(geojson_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            starts, lengths = array('Q'), array('Q')
+            entries = {field: [] for field in keys}
+            for ordinal, (start, end) in enumerate(feature_spans(data)):
+                starts.append(start)
+                lengths.append(end - start)
+                properties = json.loads(data[start:end]).get('properties') or {}
+                for field in keys:
+                    if properties.get(field) not in (None, ''):
+                        entries[field].append((str(properties[field]), ordinal))
+
+    arrays = [('starts', starts), ('lengths', lengths)]
+    header = {'version': 1, 'byteorder': sys.byteorder, 'count': len(starts),
+              'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns, 'keys': {}}
+    for field, pairs in entries.items():
+        pairs.sort()
+        blob = bytearray()
+        offsets = array('Q', [0])
+        for key, _ in pairs:
+            blob.extend(key.encode('utf-8'))
+            offsets.append(len(blob))
+        header['keys'][field] = {'count': len(pairs)}
+        arrays += [(f'{field}.offsets', offsets), (f'{field}.ordinals', array('Q', [o for _, o in pairs])),
+                   (f'{field}.strings', array('B', blob))]
+
+    body = bytearray()
+    header['arrays'] = {}
+    for name, values in arrays:
+        body.extend(b'\0' * (-len(body) % ALIGN))
+        header['arrays'][name] = [len(body), len(values)]
+        body.extend(values.tobytes())
+
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % ALIGN)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, index_path)
+    return len(starts)
+
+
+class FeatureIndex:
+    """
+    Random access to the features of a GeoJSON file through its sidecar.
+    Both files are memory-mapped; a lookup parses only the features it
+    returns. The sidecar is rebuilt when missing or older than the file.
+    """
+
+    def __init__(self, geojson_path, index_path=None, keys=KEY_FIELDS):
+        self.path = geojson_path
+        self.index_path = index_path or index_path_for(geojson_path)
+        if not self._is_fresh():
+            build_index(geojson_path, self.index_path, keys)
+
+        with open(self.path, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.index_path, 'rb') as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_length, = struct.unpack_from('<I', self._index, len(MAGIC))
+        self._body = len(MAGIC) + 4 + header_length
+        self.header = json.loads(self._index[len(MAGIC) + 4:self._body])
+        self._arrays = {}
+        self._starts = self._array('starts', 'Q')
+        self._lengths = self._array('lengths', 'Q')
+
+    def _is_fresh(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return False
+                header_length, = struct.unpack('<I', f.read(4))
+                header = json.loads(f.read(header_length))
+        except (OSError, ValueError, struct.error):
+            return False
+        stat = os.stat(self.path)
+        return (header.get('byteorder') == sys.byteorder and header.get('source_size') == stat.st_size
+                and header.get('source_mtime_ns') == stat.st_mtime_ns)
+
+    def _array(self, name, fmt):
+        if name not in self._arrays:
+            offset, length = self.header['arrays'][name]
+            start = self._body + offset
+            self._arrays[name] = memoryview(self._index)[start:start + length * struct.calcsize(fmt)].cast(fmt)
+        return self._arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in self._arrays.values():
+            view.release()
+        self._arrays = {}
+        self._data.close()
+        self._index.close()
+
+    def __len__(self):
+        return self.header['count']
+
+    def raw(self, ordinal):
+        """The feature's bytes exactly as they appear in the file."""
+        start = self._starts[ordinal]
+        return self._data[start:start + self._lengths[ordinal]]
+
+    def feature(self, ordinal):
+        return json.loads(self.raw(ordinal))
+
+    def _key(self, field, position):
+        offsets = self._array(f'{field}.offsets', 'Q')
+        strings = self._array(f'{field}.strings', 'B')
+        return bytes(strings[offsets[position]:offsets[position + 1]]).decode('utf-8')
+
+    def _positions(self, field, low, high):
+        """Positions in the sorted key list with low <= key < high (None: open)."""
+        if field not in self.header['keys']:
+            raise KeyError(f"{field} is not indexed in {self.index_path}")
+        count = self.header['keys'][field]['count']
+        keys = _SortedKeys(self, field, count)
+        first = 0 if low is None else bisect.bisect_left(keys, str(low))
+        last = count if high is None else bisect.bisect_left(keys, str(high))
+        return range(first, last)
+
+    def ordinals(self, field, key):
+        """Ordinals of the features whose `field` equals `key`, in file order."""
+        key = str(key)
+        ordinals = self._array(f'{field}.ordinals', 'Q')
+        # No key sorts between `key` and `key + '\0'` except `key` itself.
+        return sorted(ordinals[p] for p in self._positions(field, key, key + '\0'))
+
+    def get(self, field, key):
+        """Features whose `field` equals `key` (lab numbers can repeat)."""
+        return [self.feature(ordinal) for ordinal in self.ordinals(field, key)]
+
+    def range(self, field, low=None, high=None):
+        """Yields (key, feature) with low <= key < high, in key order."""
+        ordinals = self._array(f'{field}.ordinals', 'Q')
+        for position in self._positions(field, low, high):
+            yield self._key(field, position), self.feature(ordinals[position])
+
+
+class _SortedKeys:
+    """Sequence view of one field's sorted keys, for bisect."""
+
+    def __init__(self, index, field, count):
+        self._index = index
+        self._field = field
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        return self._index._key(self._field, position)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Index GeoJSON files for random access by key.")
+    parser.add_argument('paths', nargs='+', help="GeoJSON files to index")
+    parser.add_argument('--key', action='append', dest='keys', help="Property to index (default: labnr, id)")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        count = build_index(path, keys=args.keys or KEY_FIELDS)
+        print(f"Indexed {count} features of {path} -> {index_path_for(path)}")
@@ -0,0 +1,173 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Setting RQPEDIA_TRACE=<path> turns instrumentation on; the pipeline runner
+# writes its trace there (or to the path given with --trace).
+ENV_VAR = 'RQPEDIA_TRACE'
+
+# Library calls timed automatically once patch_libraries() has run. They are
+# looked up on the module at call time, so `import json; json.load(...)` and
+# `import pandas as pd; pd.merge(...)` in the stage scripts are both covered.
+LIBRARY_CALLS = [
+    ('json', 'load', 'io'),
+    ('json', 'dump', 'io'),
+    ('pandas', 'read_csv', 'pandas'),
+    ('pandas', 'merge', 'pandas'),
+    ('scripts.calibration_curves', 'calibrate', 'calibration'),
+]
+
+_enabled = bool(os.environ.get(ENV_VAR))
+_events = []
+_stack = []
+_lock = threading.Lock()
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def _now_us():
+    return time.perf_counter_ns() // 1000
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+@contextlib.contextmanager
+def span(name, cat='stage', **args):
+    """
+    Times a block and records its peak traced memory. Yields the span's
+    `args` dict so callers can attach counts. A no-op unless enabled.
+    """
+    if not _enabled:
+        yield args
+        return
+
+    # The outermost span starts tracing if nobody else has, and stops it.
+    owns_tracing = not _stack and not tracemalloc.is_tracing()
+    if owns_tracing:
+        tracemalloc.start()
+    # Fold the parent's peak so far into its frame before measuring the child.
+    if _stack:
+        _stack[-1]['peak'] = max(_stack[-1]['peak'], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    frame = {'peak': 0}
+    _stack.append(frame)
+    rss_before = _max_rss_kb()
+    start = _now_us()
+    try:
+        yield args
+    finally:
+        duration = _now_us() - start
+        peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+        _stack.pop()
+        if _stack:
+            _stack[-1]['peak'] = max(_stack[-1]['peak'], peak)
+        args.update(frame.get('counters', {}))
+        args['peak_traced_bytes'] = peak
+        # ru_maxrss is the peak of the whole process, which pipeline workers
+        # reuse across stages; report how much this span raised it as well
+        # as the cumulative value.
+        rss_after = _max_rss_kb()
+        args['max_rss_growth_kb'] = rss_after - rss_before if rss_after is not None else None
+        args['process_max_rss_kb'] = rss_after
+        if owns_tracing:
+            tracemalloc.stop()
+        with _lock:
+            _events.append({
+                'name': name, 'cat': cat, 'ph': 'X', 'ts': start, 'dur': duration,
+                'pid': os.getpid(), 'tid': threading.get_ident() % 1000000, 'args': args,
+            })
+
+
+def count(name, value=1):
+    """Adds `value` to a counter on the innermost open span."""
+    if not _enabled or not _stack:
+        return
+    frame = _stack[-1]
+    counters = frame.setdefault('counters', {})
+    counters[name] = counters.get(name, 0) + value
+
+
+def _records(obj):
+    if isinstance(obj, dict) and isinstance(obj.get('features'), list):
+        return len(obj['features'])
+    if isinstance(obj, list):
+        return len(obj)
+    return getattr(obj, 'shape', (None,))[0]
+
+
+def _wrap(func, label, cat):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with span(label, cat=cat) as span_args:
+            result = func(*args, **kwargs)
+            # json.dump returns None; count what was written instead.
+            records = _records(result if result is not None else (args[0] if args else None))
+            if records is not None:
+                span_args['records'] = records
+        # Roll the call up into the enclosing span (usually the stage).
+        count(f'{label}.calls')
+        if records is not None:
+            count(f'{label}.records', records)
+        return result
+    wrapper._rqpedia_wrapped = True
+    return wrapper
+
+
+def patch_libraries():
+    """Wraps the calls in LIBRARY_CALLS of already-imported modules in spans."""
+    for module_name, attr, cat in LIBRARY_CALLS:
+        module = sys.modules.get(module_name)
+        func = getattr(module, attr, None) if module else None
+        if func is None or getattr(func, '_rqpedia_wrapped', False):
+            continue
+        setattr(module, attr, _wrap(func, f'{module_name.split(".")[-1]}.{attr}', cat))
+
+
+def file_bytes(paths):
+    """Total size of the existing files in `paths`."""
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+
+def drain():
+    """Returns the recorded events and clears them."""
+    with _lock:
+        events = list(_events)
+        _events.clear()
+    return events
+
+
+def write_trace(path, events):
+    """
+    Writes events in the Chrome trace event format, readable by Perfetto,
+    chrome://tracing and speedscope.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps({'traceEvents': sorted(events, key=lambda e: e['ts']), 'displayTimeUnit': 'ms'}))
+    os.replace(tmp_path, path)
@@ -0,0 +1,385 @@
+import argparse
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from scripts import instrument
+
+STATE_DIR = '.pipeline'
+STATE_PATH = os.path.join(STATE_DIR, 'state.json')
+
+
+class Stage:
+    """
+    A pipeline step: a function in a script file, the files it reads and the
+    files it writes. Stages are ordered by matching outputs to inputs.
+    """
+
+    def __init__(self, name, script, function, inputs=(), outputs=(), kwargs=None):
+        self.name = name
+        self.script = script
+        self.function = function
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.kwargs = kwargs or {}
+
+
+STAGES = [
+    Stage('transform', 'transform_data.py', 'main',
+          inputs=['dateTable.csv', 'siteTable.csv'],
+          outputs=['new_data.json'],
+          kwargs={'date_table': 'dateTable.csv', 'site_table': 'siteTable.csv', 'output_path': 'new_data.json'}),
+    # `verify` writes a summary only when the check passes; standardize reads
+    # it so that a failed check stops everything downstream.
+    Stage('verify', 'verify_data.py', 'main',
+          inputs=['C14/data/output_full.geojson'],
+          outputs=[f'{STATE_DIR}/verified.json'],
+          kwargs={'path': 'C14/data/output_full.geojson', 'output_path': f'{STATE_DIR}/verified.json'}),
+    Stage('standardize', 'C14/standardize_and_merge.py', 'standardize_and_merge',
+          inputs=['C14/data/output_full.geojson', f'{STATE_DIR}/verified.json'],
+          outputs=[f'{STATE_DIR}/standardized.geojson'],
+          kwargs={'input_path': 'C14/data/output_full.geojson', 'output_path': f'{STATE_DIR}/standardized.geojson'}),
+    Stage('fetch_medafricarbon', 'scripts/enrich_c14_data.py', 'download_medafricarbon',
+          outputs=[f'{STATE_DIR}/medafricarbon.zip'],
+          kwargs={'archive_path': f'{STATE_DIR}/medafricarbon.zip'}),
+    Stage('enrich', 'scripts/enrich_c14_data.py', 'enrich_c14_data',
+          inputs=[f'{STATE_DIR}/standardized.geojson', f'{STATE_DIR}/medafricarbon.zip'],
+          outputs=[f'{STATE_DIR}/enriched.geojson'],
+          kwargs={'geojson_path': f'{STATE_DIR}/standardized.geojson',
+                  'output_path': f'{STATE_DIR}/enriched.geojson',
+                  'archive_path': f'{STATE_DIR}/medafricarbon.zip'}),
+    # The SQLite store is the canonical dataset: upstream records are merged
+    # into it (keeping edits made in the store) and the GeoJSON every later
+    # stage reads is exported from it.
+    Stage('store', 'scripts/store.py', 'import_geojson',
+          inputs=[f'{STATE_DIR}/enriched.geojson'],
+          outputs=['C14/data/rqpedia.sqlite'],
+          kwargs={'input_path': f'{STATE_DIR}/enriched.geojson'}),
+    Stage('export', 'scripts/store.py', 'export_geojson',
+          inputs=['C14/data/rqpedia.sqlite'],
+          outputs=['C14/data/output_standardized.geojson']),
+    Stage('curves', 'scripts/calibration_curves.py', 'build_binary',
+          inputs=['C14/data/intcal20.14c'],
+          outputs=['C14/data/.curve_cache/intcal20.bin'],
+          kwargs={'source': 'C14/data/intcal20.14c', 'target': 'C14/data/.curve_cache/intcal20.bin'}),
+    Stage('chronology', 'scripts/chronology.py', 'write_chronology',
+          inputs=['C14/data/output_standardized.geojson', 'C14/data/intcal20.14c'],
+          outputs=['C14/data/chronology.json']),
+    Stage('regions', 'scripts/regions.py', 'write_regions',
+          inputs=['C14/data/output_standardized.geojson', 'C14/data/boundaries.geojson'],
+          outputs=['C14/data/regions.json']),
+    Stage('bibliography', 'scripts/bibliography.py', 'write_bibliography',
+          inputs=['C14/data/output_standardized.geojson'],
+          outputs=['C14/data/output_compact.geojson', 'C14/data/bibliography.json',
+                   'C14/data/reference_index.json']),
+    Stage('stats_cube', 'scripts/stats_cube.py', 'write_cube',
+          inputs=['C14/data/output_standardized.geojson'],
+          outputs=['C14/data/stats_cube.json']),
+    Stage('profiles', 'scripts/build_profiles.py', 'build_profiles',
+          inputs=['C14/data/output_standardized.geojson'],
+          outputs=['C14/profiles/.manifest.json']),
+    Stage('columnar', 'scripts/export_columnar.py', 'write_columnar',
+          inputs=['FinalVersion/output_full.geojson'],
+          outputs=['FinalVersion/output_full.rqc']),
+    Stage('facets', 'scripts/facets.py', 'write_facets',
+          inputs=['FinalVersion/output_full.geojson'],
+          outputs=['FinalVersion/output_full.facets']),
+    Stage('locales', 'scripts/build_locales.py', 'build_locales',
+          inputs=['FinalVersion/DataXplorer.html', 'FinalVersion/profile.html', 'FinalVersion/locales/ui.json'],
+          outputs=[f'FinalVersion/{page}.{locale}.html'
+                   for page in ('DataXplorer', 'profile') for locale in ('ar', 'en', 'fr')]),
+]
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def imported_modules(path):
+    """
+    Returns the files of the `scripts` package modules that the script at
+    `path` imports, directly or through other package modules.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    found = []
+    pending = [path]
+    while pending:
+        with open(pending.pop(), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == 'scripts':
+                names.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and (node.module or '').startswith('scripts.'):
+                names.append(node.module.split('.')[1])
+            elif isinstance(node, ast.Import):
+                names.extend(alias.name.split('.')[1] for alias in node.names if alias.name.startswith('scripts.'))
+        for name in names:
+            module_path = os.path.join(package_dir, name + '.py')
+            if module_path not in found and os.path.exists(module_path):
+                found.append(module_path)
+                pending.append(module_path)
+    return sorted(found)
+
+
+def stage_key(stage):
+    """
+    Hashes everything a stage's result depends on: its code (the script and
+    the package modules it imports), its arguments and the content of its
+    inputs.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([stage.name, stage.script, stage.function, stage.kwargs], sort_keys=True).encode('utf-8'))
+    for path in [stage.script] + sorted(stage.inputs):
+        h.update(path.encode('utf-8'))
+        h.update(file_hash(path).encode('ascii'))
+    for path in imported_modules(stage.script):
+        h.update(os.path.basename(path).encode('utf-8'))
+        h.update(file_hash(path).encode('ascii'))
+    return h.hexdigest()
+
+
+def load_script(path):
+    """Imports a script by path; most stages are plain scripts, not package modules."""
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StageFailed(Exception):
+    """A stage raised in a worker; carries the trace events it recorded."""
+
+    def __init__(self, error, events):
+        super().__init__(error, events)
+        self.error = error
+        self.events = events
+
+    def __str__(self):
+        return self.error
+
+
+def _run_stage(stage, trace):
+    """Runs a stage in a worker process; returns its trace events."""
+    if trace:
+        instrument.enable()
+    error = None
+    with instrument.span(stage.name, bytes_read=instrument.file_bytes(stage.inputs)) as args:
+        try:
+            module = load_script(stage.script)
+            instrument.patch_libraries()
+            getattr(module, stage.function)(**stage.kwargs)
+        except (Exception, SystemExit) as e:
+            error = args['error'] = f"{type(e).__name__}: {e}"
+        else:
+            args['bytes_written'] = instrument.file_bytes(stage.outputs)
+    # Drained on failure too, so a failed stage's spans reach the trace
+    # instead of the next stage run by this worker.
+    events = instrument.drain()
+    if error is not None:
+        raise StageFailed(error, events)
+    return events
+
+
+def _signature(path):
+    """Identifies one version of a file; None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _save_state(state, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def dependencies(stages):
+    """Maps each stage name to the names of the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"{output} is produced by both {producers[output]} and {stage.name}")
+            producers[output] = stage.name
+    deps = {stage.name: {producers[i] for i in stage.inputs if i in producers} for stage in stages}
+
+    # Reject cycles up front rather than deadlocking the scheduler.
+    visiting, done = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Pipeline has a cycle through stage {name}")
+        visiting.add(name)
+        for dep in deps[name]:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in deps:
+        visit(name)
+    return deps
+
+
+def select(stages, targets):
+    """Returns the named stages plus everything upstream of them."""
+    if not targets:
+        return list(stages)
+    by_name = {stage.name: stage for stage in stages}
+    unknown = set(targets) - set(by_name)
+    if unknown:
+        raise KeyError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    deps = dependencies(stages)
+    wanted = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+    return [stage for stage in stages if stage.name in wanted]
+
+
+def run_pipeline(stages=STAGES, targets=None, jobs=None, force=False, state_path=STATE_PATH, trace=None):
+    """
+    Runs stages in dependency order, in parallel where independent. A stage
+    is skipped when its key matches the last successful run and its outputs
+    are still the files it wrote. A stage fails when it raises or leaves any
+    of its outputs unwritten. Returns {stage name: status}.
+
+    With `trace` (or RQPEDIA_TRACE) set to a path, per-stage timings, memory
+    peaks, record counts and bytes read/written are written there as a
+    Chrome trace.
+    """
+    trace = trace or os.environ.get(instrument.ENV_VAR)
+    events = []
+    started = time.perf_counter_ns() // 1000
+    stages = select(stages, targets)
+    deps = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    state = _load_state(state_path)
+    status = {}
+    running = {}
+    # Outputs as they were before each stage ran: a file left over from an
+    # earlier run does not count as written.
+    previous_outputs = {}
+
+    def ready():
+        return [name for name in by_name
+                if name not in status and name not in running.values()
+                and all(status.get(dep) in ('ran', 'cached') for dep in deps[name])]
+
+    def blocked():
+        for name in by_name:
+            if name not in status and any(status.get(dep) in ('failed', 'skipped') for dep in deps[name]):
+                status[name] = 'skipped'
+                print(f"[{name}] skipped: an upstream stage did not complete")
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while len(status) < len(by_name):
+            blocked()
+            for name in ready():
+                stage = by_name[name]
+                missing = [path for path in stage.inputs if not os.path.exists(path)]
+                if missing:
+                    status[name] = 'skipped'
+                    print(f"[{name}] skipped: missing input {', '.join(missing)}")
+                    continue
+
+                key = stage_key(stage)
+                previous = state.get(name, {})
+                outputs_intact = all(
+                    os.path.exists(path) and file_hash(path) == previous.get('outputs', {}).get(path)
+                    for path in stage.outputs
+                )
+                if not force and previous.get('key') == key and outputs_intact:
+                    status[name] = 'cached'
+                    print(f"[{name}] up to date")
+                    continue
+
+                # Stages write where they are told; make sure the directories exist.
+                for path in stage.outputs:
+                    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                previous_outputs[name] = {path: _signature(path) for path in stage.outputs}
+                print(f"[{name}] running")
+                future = executor.submit(_run_stage, stage, bool(trace))
+                running[future] = name
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                stage = by_name[name]
+                error = future.exception()
+                if isinstance(error, StageFailed):
+                    events.extend(error.events)
+                elif error is None:
+                    events.extend(future.result())
+                unwritten = [path for path in stage.outputs
+                             if _signature(path) in (None, previous_outputs[name][path])]
+                if error is None and unwritten:
+                    error = f"did not write {', '.join(unwritten)}"
+                if error is not None:
+                    status[name] = 'failed'
+                    state.pop(name, None)
+                    print(f"[{name}] failed: {error}")
+                else:
+                    status[name] = 'ran'
+                    state[name] = {
+                        'key': stage_key(stage),
+                        'outputs': {path: file_hash(path) for path in stage.outputs},
+                    }
+                    print(f"[{name}] done")
+                _save_state(state, state_path)
+
+    if trace:
+        events.append({
+            'name': 'pipeline', 'cat': 'pipeline', 'ph': 'X', 'ts': started,
+            'dur': time.perf_counter_ns() // 1000 - started, 'pid': os.getpid(), 'tid': 0,
+            'args': {name: result for name, result in status.items()},
+        })
+        instrument.write_trace(trace, events)
+        print(f"Trace written to {trace}")
+
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the data pipeline, skipping stages whose inputs are unchanged.")
+    parser.add_argument('targets', nargs='*', help="Stages to build, with their upstream stages (default: all)")
+    parser.add_argument('--jobs', type=int, default=None, help="Stages to run in parallel (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Run stages even if they are up to date")
+    parser.add_argument('--list', action='store_true', help="List the stages and exit")
+    parser.add_argument('--trace', help="Write a Chrome trace of the run to this path")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage_deps in dependencies(STAGES).items():
+            print(f"{stage_deps[0]}: after {', '.join(sorted(stage_deps[1])) or '-'}")
+    else:
+        results = run_pipeline(targets=args.targets, jobs=args.jobs, force=args.force, trace=args.trace)
+        if 'failed' in results.values():
+            raise SystemExit(1)
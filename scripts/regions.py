@@ -0,0 +1,232 @@
+import argparse
+import json
+import math
+import os
+
+INPUT_PATH = 'C14/data/output_standardized.geojson'
+OUTPUT_PATH = 'C14/data/regions.json'
+
+# Administrative boundaries are not shipped with the repository. Any polygon
+# GeoJSON works, e.g. Natural Earth's admin-1 states/provinces (1:10m)
+# exported to GeoJSON; the country code and region name are read from the
+# first of these properties that is set.
+BOUNDARIES_PATH = 'C14/data/boundaries.geojson'
+COUNTRY_FIELDS = ['iso_a2', 'ISO_A2', 'adm0_a2', 'ADM0_A2', 'country_code', 'country']
+REGION_FIELDS = ['name', 'NAME', 'region', 'name_en']
+
+# Country names some sources use instead of ISO codes.
+COUNTRY_ALIASES = {
+    'morocco': 'MA', 'maroc': 'MA', 'western sahara': 'EH', 'algeria': 'DZ', 'tunisia': 'TN',
+    'spain': 'ES', 'portugal': 'PT', 'mauritania': 'MR', 'libya': 'LY', 'egypt': 'EG',
+}
+
+# Size in degrees of the grid cells used to find candidate polygons.
+CELL_SIZE = 1.0
+
+# Edges per horizontal band in a prepared polygon.
+EDGES_PER_BAND = 8
+
+COLUMNS = ['feature', 'labnr', 'site', 'lon', 'lat', 'recorded_country', 'country', 'region', 'flags']
+
+
+def normalise_country(value):
+    if not value:
+        return None
+    value = str(value).strip()
+    return COUNTRY_ALIASES.get(value.lower(), value.upper())
+
+
+class PreparedShape:
+    """
+    A (multi)polygon prepared for repeated point tests: its edges are
+    bucketed into horizontal bands, so a test only visits the edges that
+    cross the point's latitude band. Rings are combined even-odd, which
+    handles holes and multi-part shapes alike.
+    """
+
+    def __init__(self, rings, country, region):
+        self.country = country
+        self.region = region
+        edges = []
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                if y1 != y2:
+                    edges.append((x1, y1, x2, y2))
+        xs = [x for ring in rings for x, _ in ring]
+        ys = [y for ring in rings for _, y in ring]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        self.band_count = max(1, len(edges) // EDGES_PER_BAND)
+        self.band_height = (self.bbox[3] - self.bbox[1]) / self.band_count or 1.0
+        self.bands = [[] for _ in range(self.band_count)]
+        for edge in edges:
+            low, high = sorted((edge[1], edge[3]))
+            for band in range(self._band(low), self._band(high) + 1):
+                self.bands[band].append(edge)
+
+    def _band(self, y):
+        return min(self.band_count - 1, max(0, int((y - self.bbox[1]) / self.band_height)))
+
+    def contains(self, x, y):
+        west, south, east, north = self.bbox
+        if not (west <= x <= east and south <= y <= north):
+            return False
+        inside = False
+        for x1, y1, x2, y2 in self.bands[self._band(y)]:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+
+def _rings(geometry):
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return []
+    # Drop the closing vertex; PreparedShape closes rings itself.
+    return [[tuple(point[:2]) for point in ring[:-1] if point] for polygon in polygons for ring in polygon]
+
+
+def _first(properties, fields):
+    for field in fields:
+        if properties.get(field) not in (None, '', '-99'):
+            return properties[field]
+    return None
+
+
+class BoundaryIndex:
+    """Point-to-region lookup over a set of prepared boundary polygons."""
+
+    def __init__(self, shapes, cell_size=CELL_SIZE):
+        self.shapes = shapes
+        self.cell_size = cell_size
+        self.grid = {}
+        for number, shape in enumerate(shapes):
+            west, south, east, north = shape.bbox
+            for cx in range(self._cell(west), self._cell(east) + 1):
+                for cy in range(self._cell(south), self._cell(north) + 1):
+                    self.grid.setdefault((cx, cy), []).append(number)
+
+    @classmethod
+    def load(cls, path=BOUNDARIES_PATH, cell_size=CELL_SIZE):
+        with open(path, 'r', encoding='utf-8') as f:
+            features = json.load(f)['features']
+        shapes = []
+        for feature in features:
+            rings = _rings(feature.get('geometry') or {'type': None})
+            rings = [ring for ring in rings if len(ring) >= 3]
+            if rings:
+                properties = feature.get('properties') or {}
+                shapes.append(PreparedShape(rings, normalise_country(_first(properties, COUNTRY_FIELDS)),
+                                            _first(properties, REGION_FIELDS)))
+        return cls(shapes, cell_size)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def locate(self, lon, lat):
+        """Returns the shape containing the point, or None (sea, or outside coverage)."""
+        for number in self.grid.get((self._cell(lon), self._cell(lat)), ()):
+            if self.shapes[number].contains(lon, lat):
+                return self.shapes[number]
+        return None
+
+    def locate_many(self, points):
+        """
+        Locates a batch of (lon, lat) points. Points are grouped by grid cell
+        and duplicate coordinates are resolved once.
+        """
+        results = {}
+        by_cell = {}
+        for point in set(points):
+            by_cell.setdefault((self._cell(point[0]), self._cell(point[1])), []).append(point)
+        for cell, cell_points in by_cell.items():
+            candidates = [self.shapes[n] for n in self.grid.get(cell, ())]
+            for lon, lat in cell_points:
+                results[lon, lat] = next((s for s in candidates if s.contains(lon, lat)), None)
+        return [results[point] for point in points]
+
+
+def _coordinates(feature):
+    geometry = feature.get('geometry') or {}
+    coordinates = geometry.get('coordinates') if geometry.get('type') == 'Point' else None
+    if not coordinates or len(coordinates) < 2:
+        return None
+    try:
+        lon, lat = float(coordinates[0]), float(coordinates[1])
+    except (TypeError, ValueError):
+        return None
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        return None
+    return lon, lat
+
+
+def assign_regions(features, boundaries):
+    """
+    Assigns country and region to every feature and flags suspect
+    coordinates: 'invalid', 'ocean' (in no polygon), 'country_mismatch'
+    (in another country than recorded) and 'swapped' (lat/lon exchanged
+    would put it in the recorded country). Returns a dict of columns.
+    """
+    points = [_coordinates(feature) for feature in features]
+    valid = [point for point in points if point is not None]
+    located = dict(zip(valid, boundaries.locate_many(valid)))
+    swapped_points = [(lat, lon) for lon, lat in valid if -90 <= lon <= 90]
+    swapped = dict(zip(swapped_points, boundaries.locate_many(swapped_points)))
+
+    columns = {name: [] for name in COLUMNS}
+    for number, (feature, point) in enumerate(zip(features, points)):
+        properties = feature.get('properties') or {}
+        recorded = normalise_country(properties.get('country'))
+        shape = located.get(point) if point else None
+        flags = []
+        if point is None:
+            flags.append('invalid')
+        else:
+            if shape is None:
+                flags.append('ocean')
+            elif recorded and shape.country and shape.country != recorded:
+                flags.append('country_mismatch')
+            if shape is None or 'country_mismatch' in flags:
+                alternative = swapped.get((point[1], point[0]))
+                if alternative is not None and (not recorded or alternative.country == recorded):
+                    flags.append('swapped')
+        row = {'feature': number, 'labnr': properties.get('labnr'), 'site': properties.get('site'),
+               'lon': point[0] if point else None, 'lat': point[1] if point else None,
+               'recorded_country': recorded, 'country': shape.country if shape else None,
+               'region': shape.region if shape else None, 'flags': flags}
+        for name in COLUMNS:
+            columns[name].append(row[name])
+    return columns
+
+
+def write_regions(input_path=INPUT_PATH, output_path=OUTPUT_PATH, boundaries_path=BOUNDARIES_PATH):
+    """Pipeline stage: writes region assignments and coordinate flags."""
+    boundaries = BoundaryIndex.load(boundaries_path)
+    with open(input_path, 'r', encoding='utf-8') as f:
+        features = json.load(f)['features']
+
+    columns = assign_regions(features, boundaries)
+    summary = {}
+    for flags in columns['flags']:
+        for flag in flags:
+            summary[flag] = summary.get(flag, 0) + 1
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.basename(input_path), 'boundaries': os.path.basename(boundaries_path),
+                   'summary': summary, 'columns': columns}, f, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Assign countries/regions from boundary polygons and check coordinates.")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--boundaries', default=BOUNDARIES_PATH)
+    args = parser.parse_args()
+
+    summary = write_regions(args.input, args.output, args.boundaries)
+    print(f"Wrote {args.output}: " + (', '.join(f"{n} {flag}" for flag, n in sorted(summary.items())) or 'no flags'))
@@ -0,0 +1,225 @@
+import argparse
+import itertools
+import json
+import math
+import os
+
+from scripts.chronology import UNIT_YEARS
+
+INPUT_PATH = 'C14/data/output_standardized.geojson'
+OUTPUT_PATH = 'C14/data/stats_cube.json'
+
+# Every subset of these is precomputed, from the grand total ('*') to the
+# finest grouping ('site+country+material+period+method').
+DIMENSIONS = ['site', 'country', 'material', 'period', 'method']
+APEX = '*'
+
+# Histogram bin widths in years; bin i covers [i * width, (i + 1) * width).
+BP_BIN = 500
+STD_BIN = 25
+
+QUANTILES = [0, 0.25, 0.5, 0.75, 1]
+
+UNKNOWN = 'Unknown'
+
+
+def grouping_name(dimensions):
+    return '+'.join(d for d in DIMENSIONS if d in dimensions) or APEX
+
+
+def _number(value):
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _years(date):
+    """Age and error in years; (None, None) when the unit is not known."""
+    scale = UNIT_YEARS.get(str(date.get('unit') or 'BP').strip().lower())
+    if scale is None:
+        return None, None
+    age, error = _number(date.get('age')), _number(date.get('error'))
+    return (age * scale if age is not None else None), (error * scale if error is not None else None)
+
+
+def _text(value):
+    value = str(value).strip() if value is not None else ''
+    return value or UNKNOWN
+
+
+def _dates(properties):
+    """The feature's dates; features in the legacy layout carry one C14 date in bp/std."""
+    return properties.get('dates') or [{'dating_method': 'C14', 'age': properties.get('bp'),
+                                        'error': properties.get('std')}]
+
+
+def _members(properties, date):
+    """The value(s) of every dimension for one date; a date counts once in each of its periods."""
+    periods = properties.get('periods')
+    if not isinstance(periods, list):
+        periods = [properties.get('period')]
+    return {'site': [_text(properties.get('site'))],
+            'country': [_text(properties.get('country'))],
+            'material': [_text(properties.get('material'))],
+            'period': sorted({_text(period) for period in periods}) or [UNKNOWN],
+            'method': [_text(date.get('dating_method'))]}
+
+
+def quantiles(values):
+    """Linearly interpolated QUANTILES of sorted values."""
+    if not values:
+        return None
+    result = []
+    for q in QUANTILES:
+        position = q * (len(values) - 1)
+        low = math.floor(position)
+        high = min(low + 1, len(values) - 1)
+        value = round(values[low] + (values[high] - values[low]) * (position - low), 1)
+        result.append(int(value) if value.is_integer() else value)
+    return result
+
+
+def _histogram(values, width):
+    """Sparse histogram as a flat [bin, count, bin, count, ...] list."""
+    counts = {}
+    for value in values:
+        counts[int(value // width)] = counts.get(int(value // width), 0) + 1
+    return [x for item in sorted(counts.items()) for x in item]
+
+
+def build_cube(features):
+    """
+    Aggregates the dates of every feature into each grouping of DIMENSIONS.
+    A cell is [codes..., stats], where the codes index the per-dimension
+    value lists and stats indexes the shared `stats` table of [count, bp
+    histogram, std histogram, bp quantiles, std quantiles]. Most fine cells
+    repeat a coarser one (one site, one country), so statistics are stored
+    once.
+    """
+    groupings = [combo for size in range(len(DIMENSIONS) + 1) for combo in itertools.combinations(DIMENSIONS, size)]
+    values = {dimension: set() for dimension in DIMENSIONS}
+    cells = {combo: {} for combo in groupings}
+    for feature in features:
+        properties = feature.get('properties') or {}
+        for date in _dates(properties):
+            members = _members(properties, date)
+            for dimension in DIMENSIONS:
+                values[dimension].update(members[dimension])
+            bp, std = _years(date)
+            for combo in groupings:
+                for key in itertools.product(*(members[d] for d in combo)):
+                    cell = cells[combo].get(key)
+                    if cell is None:
+                        cell = cells[combo][key] = [0, [], []]
+                    cell[0] += 1
+                    if bp is not None:
+                        cell[1].append(bp)
+                    if std is not None:
+                        cell[2].append(std)
+
+    values = {dimension: sorted(members) for dimension, members in values.items()}
+    codes = {dimension: {value: code for code, value in enumerate(members)} for dimension, members in values.items()}
+    cube = {'version': 1, 'dimensions': DIMENSIONS, 'values': values, 'bp_bin': BP_BIN, 'std_bin': STD_BIN,
+            'quantiles': QUANTILES, 'stats': [], 'cells': {}}
+    shared = {}
+    for combo in groupings:
+        rows = []
+        for key, (count, bps, stds) in sorted(cells[combo].items()):
+            bps.sort()
+            stds.sort()
+            stats = [count, _histogram(bps, BP_BIN), _histogram(stds, STD_BIN), quantiles(bps), quantiles(stds)]
+            number = shared.setdefault(json.dumps(stats), len(shared))
+            if number == len(cube['stats']):
+                cube['stats'].append(stats)
+            rows.append([codes[d][v] for d, v in zip(combo, key)] + [number])
+        cube['cells'][grouping_name(combo)] = rows
+    return cube
+
+
+def write_cube(input_path=INPUT_PATH, output_path=OUTPUT_PATH):
+    """Pipeline stage: writes the cube as compact JSON. Returns the number of cells."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        features = json.load(f)['features']
+    cube = build_cube(features)
+    cube['source'] = os.path.basename(input_path)
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cube, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, output_path)
+    return sum(len(rows) for rows in cube['cells'].values())
+
+
+class StatsCube:
+    """
+    Lookups into a cube written by write_cube(). Filters are dimension=value
+    keyword arguments; every query reads one precomputed cell.
+    """
+
+    def __init__(self, cube):
+        self.cube = cube
+        self.dimensions = cube['dimensions']
+        self._codes = {d: {value: code for code, value in enumerate(members)} for d, members in cube['values'].items()}
+        self._cells = {}
+
+    @classmethod
+    def load(cls, path=OUTPUT_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def values(self, dimension):
+        return list(self.cube['values'][dimension])
+
+    def _grouping(self, dimensions):
+        """Cells of one grouping keyed by their code tuples, decoded on first use."""
+        name = grouping_name(dimensions)
+        if name not in self._cells:
+            size = len(dimensions)
+            self._cells[name] = {tuple(row[:size]): row[size] for row in self.cube['cells'][name]}
+        return self._cells[name]
+
+    def _decode(self, number):
+        count, bp_histogram, std_histogram, bp_quantiles, std_quantiles = self.cube['stats'][number]
+        return {'count': count,
+                'bp_histogram': {i * self.cube['bp_bin']: n for i, n in zip(bp_histogram[::2], bp_histogram[1::2])},
+                'std_histogram': {i * self.cube['std_bin']: n for i, n in zip(std_histogram[::2], std_histogram[1::2])},
+                'bp_quantiles': bp_quantiles, 'std_quantiles': std_quantiles}
+
+    def cell(self, **filters):
+        """
+        Statistics of the dates matching every filter: count, histograms
+        keyed by bin start, and quantiles. None when no date matches.
+        """
+        unknown = set(filters) - set(self.dimensions)
+        if unknown:
+            raise KeyError(f"Unknown dimension(s): {', '.join(sorted(unknown))}")
+        dimensions = [d for d in self.dimensions if d in filters]
+        try:
+            key = tuple(self._codes[d][filters[d]] for d in dimensions)
+        except KeyError:
+            return None
+        number = self._grouping(dimensions).get(key)
+        return self._decode(number) if number is not None else None
+
+    def group_by(self, dimension, **filters):
+        """{value: cell} for every value of `dimension` among the dates matching the filters."""
+        result = {}
+        for value in self.cube['values'][dimension]:
+            cell = self.cell(**filters, **{dimension: value})
+            if cell is not None:
+                result[value] = cell
+        return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute date statistics for every grouping of the dataset.")
+    parser.add_argument('--input', default=INPUT_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    count = write_cube(args.input, args.output)
+    print(f"Wrote {count} cells to {args.output} ({os.path.getsize(args.output):,} bytes)")
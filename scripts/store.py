@@ -0,0 +1,348 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+
+from scripts import bibliography
+
+INPUT_PATH = 'C14/data/output_standardized.geojson'
+DB_PATH = 'C14/data/rqpedia.sqlite'
+EXPORT_PATH = 'C14/data/output_standardized.geojson'
+
+# Date fields with their own columns. Dates with other fields, or missing
+# some of these, also keep their key layout in `extra` (own fields as null).
+DATE_FIELDS = ['dating_method', 'age', 'error', 'unit']
+
+# `age`, `error` and `properties` values are stored exactly as they arrive
+# (columns without a declared type keep '3490.0' a string and 290.0 a float),
+# so an export reproduces the original records.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sites (
+    site_id INTEGER PRIMARY KEY,
+    name TEXT,
+    country TEXT,
+    lon REAL,
+    lat REAL
+);
+CREATE INDEX IF NOT EXISTS sites_name ON sites (name, country);
+CREATE TABLE IF NOT EXISTS samples (
+    sample_id INTEGER PRIMARY KEY,
+    sample_key TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL,
+    labnr TEXT,
+    record_id TEXT,
+    site_id INTEGER REFERENCES sites (site_id),
+    material TEXT,
+    properties TEXT NOT NULL,
+    has_references INTEGER NOT NULL,
+    has_dates INTEGER NOT NULL,
+    layout TEXT,
+    source_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_labnr ON samples (labnr);
+CREATE INDEX IF NOT EXISTS samples_site ON samples (site_id);
+CREATE INDEX IF NOT EXISTS samples_position ON samples (position);
+CREATE TABLE IF NOT EXISTS dates (
+    sample_id INTEGER NOT NULL REFERENCES samples (sample_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    dating_method TEXT,
+    age,
+    error,
+    unit TEXT,
+    extra TEXT,
+    PRIMARY KEY (sample_id, position)
+);
+CREATE INDEX IF NOT EXISTS dates_method ON dates (dating_method);
+CREATE TABLE IF NOT EXISTS refs (
+    ref_id TEXT PRIMARY KEY,
+    author TEXT NOT NULL,
+    year TEXT
+);
+CREATE TABLE IF NOT EXISTS sample_refs (
+    sample_id INTEGER NOT NULL REFERENCES samples (sample_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    ref_id TEXT NOT NULL REFERENCES refs (ref_id),
+    PRIMARY KEY (sample_id, position)
+);
+CREATE INDEX IF NOT EXISTS sample_refs_ref ON sample_refs (ref_id);
+"""
+
+# Columns added after the first release; connect() adds them to older stores.
+ADDED_COLUMNS = {'layout': 'TEXT', 'source_hash': 'TEXT'}
+
+# Key order of a feature as the front ends write it.
+FEATURE_KEYS = ['type', 'properties', 'geometry']
+
+RTREE_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS site_rtree USING rtree (site_id, min_lon, max_lon, min_lat, max_lat)"
+
+
+def connect(path=DB_PATH):
+    """
+    Opens (and if needed creates) a store. WAL mode lets readers keep going
+    while a stage writes; writers wait up to 30 s for each other.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    with conn:
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(samples)')}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in columns:
+                conn.execute(f'ALTER TABLE samples ADD COLUMN {column} {kind}')
+        try:
+            conn.execute(RTREE_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without R*Tree; bounding-box queries scan `sites`.
+            pass
+    return conn
+
+
+def has_rtree(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'site_rtree'").fetchone() is not None
+
+
+def sample_key(properties, position):
+    """
+    Identity of a record. Lab numbers repeat across source databases, so the
+    key pairs the lab number with the source record id; records without a
+    lab number can only be addressed by position.
+    """
+    labnr = properties.get('labnr')
+    if labnr:
+        return f"{labnr}|{properties.get('id') or ''}"
+    return f"#{position}"
+
+
+def _site_id(conn, properties, geometry):
+    coordinates = (geometry or {}).get('coordinates') or [None, None]
+    lon, lat = coordinates[0], coordinates[1]
+    name, country = properties.get('site'), properties.get('country')
+    row = conn.execute('SELECT site_id FROM sites WHERE name IS ? AND country IS ? AND lon IS ? AND lat IS ?',
+                       (name, country, lon, lat)).fetchone()
+    if row:
+        return row[0]
+    site_id = conn.execute('INSERT INTO sites (name, country, lon, lat) VALUES (?, ?, ?, ?)',
+                           (name, country, lon, lat)).lastrowid
+    if lon is not None and has_rtree(conn):
+        conn.execute('INSERT INTO site_rtree VALUES (?, ?, ?, ?, ?)', (site_id, lon, lon, lat, lat))
+    return site_id
+
+
+def _write_sample(conn, feature, position, sample_id=None):
+    properties = feature.get('properties') or {}
+    # Blank placeholders ('') stay in `properties`; real reference lists move to `refs`.
+    has_references = isinstance(properties.get('references'), list) or bool(properties.get('references'))
+    stored = {k: v for k, v in properties.items()
+              if k != 'dates' and not (k == 'references' and has_references)}
+    # Features with another key order or extra keys keep their layout (own keys as null).
+    layout = None
+    if list(feature) != FEATURE_KEYS:
+        layout = json.dumps({k: None if k in FEATURE_KEYS else v for k, v in feature.items()}, ensure_ascii=False)
+    row = (sample_key(properties, position), position, properties.get('labnr'), properties.get('id'),
+           _site_id(conn, properties, feature.get('geometry')), properties.get('material'),
+           json.dumps(stored, ensure_ascii=False), int(has_references), int('dates' in properties), layout)
+    if sample_id is None:
+        sample_id = conn.execute(
+            'INSERT INTO samples (sample_key, position, labnr, record_id, site_id, material, properties,'
+            ' has_references, has_dates, layout) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row).lastrowid
+    else:
+        conn.execute(
+            'UPDATE samples SET sample_key = ?, position = ?, labnr = ?, record_id = ?, site_id = ?, material = ?,'
+            ' properties = ?, has_references = ?, has_dates = ?, layout = ? WHERE sample_id = ?', row + (sample_id,))
+        conn.execute('DELETE FROM dates WHERE sample_id = ?', (sample_id,))
+        conn.execute('DELETE FROM sample_refs WHERE sample_id = ?', (sample_id,))
+
+    for index, date in enumerate(properties.get('dates') or []):
+        extra = None
+        if list(date) != DATE_FIELDS:
+            extra = json.dumps({k: None if k in DATE_FIELDS else v for k, v in date.items()}, ensure_ascii=False)
+        conn.execute('INSERT INTO dates VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     (sample_id, index, date.get('dating_method'), date.get('age'), date.get('error'),
+                      date.get('unit'), extra))
+    for index, ref in enumerate(bibliography.parse_references(properties.get('references'))):
+        ref_id = bibliography.reference_id(ref)
+        conn.execute('INSERT OR IGNORE INTO refs VALUES (?, ?, ?)', (ref_id, ref['author'], ref['year']))
+        conn.execute('INSERT OR IGNORE INTO sample_refs VALUES (?, ?, ?)', (sample_id, index, ref_id))
+    return sample_id
+
+
+def upsert_feature(conn, feature):
+    """
+    Inserts or replaces one record, matched by lab number (see sample_key),
+    in a single transaction. Returns its sample_id.
+    """
+    properties = feature.get('properties') or {}
+    with conn:
+        position = conn.execute('SELECT COALESCE(MAX(position) + 1, 0) FROM samples').fetchone()[0]
+        key = sample_key(properties, position)
+        row = conn.execute('SELECT sample_id, position FROM samples WHERE sample_key = ?', (key,)).fetchone()
+        if row:
+            return _write_sample(conn, feature, row[1], row[0])
+        return _write_sample(conn, feature, position)
+
+
+def delete_sample(conn, key):
+    with conn:
+        return conn.execute('DELETE FROM samples WHERE sample_key = ?', (key,)).rowcount
+
+
+def samples_by_labnr(conn, labnr):
+    """Returns the records with a lab number (several sources may share one)."""
+    rows = conn.execute('SELECT sample_id FROM samples WHERE labnr = ? ORDER BY position', (labnr,)).fetchall()
+    return [_feature(conn, sample_id) for sample_id, in rows]
+
+
+def sites_in_bbox(conn, west, south, east, north):
+    """Returns (site_id, name, lon, lat) of the sites inside a bounding box."""
+    if has_rtree(conn):
+        query = ('SELECT s.site_id, s.name, s.lon, s.lat FROM site_rtree r JOIN sites s USING (site_id)'
+                 ' WHERE r.min_lon >= ? AND r.max_lon <= ? AND r.min_lat >= ? AND r.max_lat <= ?')
+    else:
+        query = 'SELECT site_id, name, lon, lat FROM sites WHERE lon >= ? AND lon <= ? AND lat >= ? AND lat <= ?'
+    return conn.execute(query, (west, east, south, north)).fetchall()
+
+
+def _source_hash(feature):
+    return hashlib.sha1(json.dumps(feature, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def import_geojson(input_path=INPUT_PATH, db_path=DB_PATH):
+    """
+    Pipeline stage: merges an upstream GeoJSON dataset into the store, in one
+    transaction, by sample_key. The store is the canonical copy:
+
+    - records new upstream are added;
+    - records whose upstream version changed since the last import are
+      replaced by it;
+    - records whose upstream version is unchanged are left alone, so edits
+      made with upsert_feature() survive;
+    - records that came from upstream and are no longer there are deleted;
+      records added only to the store are kept, after the upstream ones.
+
+    Returns the number of records added or replaced.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            # Keep the position of `features` among the top-level keys.
+            collection = {k: (None if k == 'features' else v) for k, v in data.items()}
+            conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('collection', json.dumps(collection)))
+            existing = {key: (sample_id, source_hash) for sample_id, key, source_hash in
+                        conn.execute('SELECT sample_id, sample_key, source_hash FROM samples')}
+            seen = set()
+            written = 0
+            for position, feature in enumerate(data['features']):
+                key = sample_key(feature.get('properties') or {}, position)
+                seen.add(key)
+                source_hash = _source_hash(feature)
+                sample_id, previous = existing.get(key, (None, None))
+                if sample_id is not None and previous == source_hash:
+                    conn.execute('UPDATE samples SET position = ? WHERE sample_id = ?', (position, sample_id))
+                    continue
+                sample_id = _write_sample(conn, feature, position, sample_id)
+                conn.execute('UPDATE samples SET source_hash = ? WHERE sample_id = ?', (source_hash, sample_id))
+                written += 1
+
+            removed = [sample_id for key, (sample_id, source_hash) in existing.items()
+                       if key not in seen and source_hash is not None]
+            conn.executemany('DELETE FROM samples WHERE sample_id = ?', [(sample_id,) for sample_id in removed])
+            local = conn.execute('SELECT sample_id FROM samples WHERE source_hash IS NULL ORDER BY position').fetchall()
+            conn.executemany('UPDATE samples SET position = ? WHERE sample_id = ?',
+                             [(len(data['features']) + n, sample_id) for n, (sample_id,) in enumerate(local)])
+            if has_rtree(conn):
+                conn.execute('DELETE FROM site_rtree WHERE site_id NOT IN (SELECT site_id FROM samples)')
+            conn.execute('DELETE FROM sites WHERE site_id NOT IN (SELECT site_id FROM samples)')
+        return written
+    finally:
+        conn.close()
+
+
+def _feature(conn, sample_id, row=None):
+    if row is None:
+        row = conn.execute(
+            'SELECT s.properties, s.has_references, s.has_dates, s.layout, t.lon, t.lat FROM samples s'
+            ' LEFT JOIN sites t USING (site_id) WHERE s.sample_id = ?', (sample_id,)).fetchone()
+    properties_json, has_references, has_dates, layout, lon, lat = row
+    properties = json.loads(properties_json)
+    if has_references:
+        properties['references'] = [
+            {'author': author, 'year': year} if year is not None else {'author': author}
+            for author, year in conn.execute(
+                'SELECT r.author, r.year FROM sample_refs s JOIN refs r USING (ref_id)'
+                ' WHERE s.sample_id = ? ORDER BY s.position', (sample_id,))]
+    if has_dates:
+        dates = []
+        for *fields, extra in conn.execute(
+                'SELECT dating_method, age, error, unit, extra FROM dates WHERE sample_id = ? ORDER BY position',
+                (sample_id,)):
+            if extra is None:
+                dates.append(dict(zip(DATE_FIELDS, fields)))
+                continue
+            date = json.loads(extra)
+            date.update((k, v) for k, v in zip(DATE_FIELDS, fields) if k in date)
+            dates.append(date)
+        properties['dates'] = dates
+    geometry = {'type': 'Point', 'coordinates': [lon, lat]} if lon is not None else None
+    feature = json.loads(layout) if layout else dict.fromkeys(FEATURE_KEYS)
+    feature.update((k, v) for k, v in (('type', 'Feature'), ('properties', properties), ('geometry', geometry))
+                   if k in feature)
+    return feature
+
+
+def iter_features(conn):
+    """Yields the stored records as GeoJSON features, in dataset order."""
+    rows = conn.execute(
+        'SELECT s.sample_id, s.properties, s.has_references, s.has_dates, s.layout, t.lon, t.lat FROM samples s'
+        ' LEFT JOIN sites t USING (site_id) ORDER BY s.position')
+    for sample_id, *row in rows:
+        yield _feature(conn, sample_id, row)
+
+
+def export_geojson(db_path=DB_PATH, output_path=EXPORT_PATH):
+    """
+    Streams the store to a GeoJSON file in the layout the front ends load
+    (2-space indent), one feature at a time.
+    """
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'collection'").fetchone()
+        collection = json.loads(row[0]) if row else {'type': 'FeatureCollection'}
+        head, tail = json.dumps(dict(collection, features=[]), indent=2).split('"features": []', 1)
+
+        count = 0
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(head + '"features": [')
+            for count, feature in enumerate(iter_features(conn), 1):
+                text = json.dumps(feature, indent=2).replace('\n', '\n    ')
+                f.write(('\n    ' if count == 1 else ',\n    ') + text)
+            f.write('\n  ]' + tail if count else ']' + tail)
+        os.replace(tmp_path, output_path)
+        return count
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge a GeoJSON dataset into the SQLite store, or export the store to GeoJSON.")
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--geojson', default=None, help="GeoJSON to import from or export to")
+    args = parser.parse_args()
+
+    if args.action == 'import':
+        count = import_geojson(args.geojson or INPUT_PATH, args.db)
+        print(f"Merged {count} new or changed records into {args.db}")
+    else:
+        count = export_geojson(args.db, args.geojson or EXPORT_PATH)
+        print(f"Exported {count} records to {args.geojson or EXPORT_PATH}")
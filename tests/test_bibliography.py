@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import bibliography
+
+
+def test_references_are_normalised_and_deduplicated():
+    features = [
+        {'properties': {'labnr': 'Gif-1', 'site': 'A', 'dates': [{'age': '100'}],
+                        'references': [{'author': 'van Willigen', 'year': '2008'}, {'author': 'CalPal'}]}},
+        {'properties': {'labnr': 'Gif-2', 'site': 'B',
+                        'references': json.dumps([{'author': ' van  Willigen ', 'year': 2008},
+                                                  {'author': 'CalPal', 'year': 'undefined'}])}},
+        {'properties': {'site': 'C', 'dates': [{'age': '300', 'reference': 'Hublin et al. 2017'}, {'age': '280'}]}},
+    ]
+
+    references, index, compact = bibliography.build_bibliography(features)
+
+    assert [ref['label'] for ref in references.values()] == ['CalPal', 'Hublin et al. 2017', 'van Willigen (2008)']
+    willigen = bibliography.reference_id({'author': 'van Willigen', 'year': '2008'})
+    assert compact[0]['properties']['references'] == compact[1]['properties']['references']
+    assert compact[0]['properties']['references'][0] == willigen
+    assert index[willigen] == {'features': [0, 1], 'dates': [[0, 0]], 'labnrs': ['Gif-1', 'Gif-2'], 'sites': ['A', 'B']}
+    hublin = bibliography.find_references({'references': references}, 'hublin')
+    assert len(hublin) == 1 and index[hublin[0]]['dates'] == [[2, 0]]
+    # The input is left untouched.
+    assert isinstance(features[1]['properties']['references'], str)
+
+
+def test_ids_do_not_depend_on_record_order(tmp_path):
+    refs = [{'author': 'Poti', 'year': '2019'}, {'author': 'Morales', 'year': '2013'}]
+    features = [{'properties': {'references': [ref]}} for ref in refs]
+    source = tmp_path / 'data.geojson'
+    paths = [str(tmp_path / name) for name in ('compact.geojson', 'bib.json', 'index.json')]
+
+    ids = []
+    for order in (features, features[::-1]):
+        source.write_text(json.dumps({'type': 'FeatureCollection', 'features': order}), encoding='utf-8')
+        bibliography.write_bibliography(str(source), *paths)
+        ids.append(bibliography.load_bibliography(paths[1], paths[2])['references'])
+
+    assert ids[0] == ids[1]
+    assert list(ids[0].values())[0]['author'] == 'Morales'
+
+
+def test_index_is_written_apart_from_the_table(tmp_path):
+    source = tmp_path / 'data.geojson'
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'properties': {'labnr': 'Gif-1', 'references': [{'author': 'Poti', 'year': '2019'}]}}]}), encoding='utf-8')
+    paths = [str(tmp_path / name) for name in ('compact.geojson', 'bib.json', 'index.json')]
+    bibliography.write_bibliography(str(source), *paths)
+
+    assert 'index' not in json.loads((tmp_path / 'bib.json').read_text(encoding='utf-8'))
+    assert '\n' not in (tmp_path / 'compact.geojson').read_text(encoding='utf-8')
+    loaded = bibliography.load_bibliography(paths[1], paths[2])
+    assert list(loaded['index'].values())[0]['labnrs'] == ['Gif-1']
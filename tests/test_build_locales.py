@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.build_locales import MissingTranslationError, render_page
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <script data-locale-redirect>
+    location.replace('DataXplorer.' + 'en' + '.html');
+  </script>
+</head>
+<body>
+  <button class="lang-btn" data-lang-switcher="ar">AR</button>
+  <a href="DataXplorer.html" data-i18n="back"><b>Back</b></a>
+  <input type="text" data-i18n="search" placeholder="Search">
+  <script src="assets/js/i18n.js"></script>
+  <script>const html = `<span data-i18n="back">Back</span>`;</script>
+</body>
+</html>
+"""
+
+TRANSLATIONS = {
+    'en': {'back': 'Back', 'search': 'Search'},
+    'ar': {'back': 'رجوع', 'search': 'بحث "موقع"'},
+}
+
+
+def test_render_page_resolves_static_translations():
+    output = render_page(PAGE, TRANSLATIONS, 'ar', pages=['DataXplorer.html'])
+
+    assert '<html lang="ar" dir="rtl">' in output
+    assert '<a href="DataXplorer.ar.html" data-i18n="back">رجوع</a>' in output
+    assert 'placeholder="بحث &quot;موقع&quot;"' in output
+    assert 'class="lang-btn active"' in output
+    # Script bodies are left for the runtime.
+    assert '`<span data-i18n="back">Back</span>`' in output
+    assert 'window.RQPEDIA_I18N = {"locale": "ar"' in output
+    # Only the unlocalized source page redirects.
+    assert 'data-locale-redirect' not in output and 'location.replace' not in output
+
+
+def test_render_page_fails_on_missing_keys():
+    translations = {'en': TRANSLATIONS['en'], 'fr': {'back': 'Retour'}}
+
+    with pytest.raises(MissingTranslationError, match='search'):
+        render_page(PAGE, translations, 'fr')
@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.build_profiles import assign_slugs, build_profiles
+
+
+def feature(labnr, site, material='charcoal'):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [-1.87, 34.48]},
+        'properties': {
+            'labnr': labnr, 'site': site, 'material': material,
+            'dates': [{'dating_method': 'C14', 'age': 3490, 'error': 90, 'unit': 'BP'}],
+        },
+    }
+
+
+def write(path, features):
+    with open(path, 'w') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+
+def test_only_pages_of_edited_feature_are_rebuilt(tmp_path):
+    input_path = tmp_path / 'data.geojson'
+    output_dir = str(tmp_path / 'profiles')
+    write(input_path, [feature('Gif-1', 'Abri Rihane'), feature('Gif-2', 'Taforalt')])
+
+    assert build_profiles(str(input_path), output_dir, jobs=1) == (5, 0, 0)
+    assert build_profiles(str(input_path), output_dir, jobs=1) == (0, 5, 0)
+
+    write(input_path, [feature('Gif-1', 'Abri Rihane', material='<b>bone</b>'), feature('Gif-2', 'Taforalt')])
+    assert build_profiles(str(input_path), output_dir, jobs=1) == (2, 3, 0)
+
+    with open(os.path.join(output_dir, 'samples', 'gif-1.html')) as f:
+        page = f.read()
+    assert '&lt;b&gt;bone&lt;/b&gt;' in page
+    assert '../sites/abri-rihane.html' in page
+
+    write(input_path, [feature('Gif-2', 'Taforalt')])
+    assert build_profiles(str(input_path), output_dir, jobs=1) == (1, 2, 2)
+    assert not os.path.exists(os.path.join(output_dir, 'sites', 'abri-rihane.html'))
+
+
+def test_colliding_slugs_are_disambiguated():
+    slugs = assign_slugs(['Chaaba Bayda', 'Chaâba Bayda', 'Taforalt'])
+
+    assert slugs['Taforalt'] == 'taforalt'
+    assert len(set(slugs.values())) == 3
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import calibration_curves
+from scripts.calibration_cache import CalibrationCache
+
+
+def test_results_persist_across_instances(tmp_path):
+    curve = calibration_curves.load_curve('intcal20')
+    path = str(tmp_path / 'cache.sqlite')
+    expected = calibration_curves.calibrate(3490, 90, curve)
+
+    with CalibrationCache(path) as cache:
+        assert cache.calibrate(3490, 90, curve) == expected
+        assert cache.calibrate('3490.0', '90.0', curve) == expected
+        assert cache.calibrate(3490, 90, curve, delta_r=100) != expected
+        assert cache.stats() == {'memory_hits': 1, 'disk_hits': 0, 'misses': 2, 'hit_rate': 1 / 3}
+
+    with CalibrationCache(path) as cache:
+        assert cache.calibrate(3490, 90, curve) == expected
+        assert cache.stats()['disk_hits'] == 1 and cache.stats()['misses'] == 0
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    curve = calibration_curves.load_curve('intcal20')
+    with CalibrationCache(str(tmp_path / 'cache.sqlite'), memory_size=2) as cache:
+        for bp in (1000, 2000, 1000, 3000, 2000):
+            cache.calibrate(bp, 30, curve)
+        # 2000 was evicted by 3000, so it came back from disk.
+        assert cache.stats()['memory_hits'] == 1
+        assert cache.stats()['disk_hits'] == 1
+        assert cache.stats()['misses'] == 3
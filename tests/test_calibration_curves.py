@@ -0,0 +1,86 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import calibration_curves
+
+
+def write_curve(path):
+    with open(path, 'w') as f:
+        f.write("# CAL BP, 14C age,Sigma\n")
+        f.write("120,110,20\n")
+        f.write("100,100,10\n")
+        f.write("0,0,10\n")
+
+
+def load_test_curve(tmp_path, monkeypatch):
+    source = tmp_path / 'test.14c'
+    write_curve(source)
+    # Keep the registry and the loaded-curve memo as they were for later tests.
+    monkeypatch.setitem(calibration_curves.CURVES, 'test', str(source))
+    monkeypatch.setattr(calibration_curves, '_loaded', {})
+    return calibration_curves.load_curve('test', cache_dir=str(tmp_path / 'cache'))
+
+
+def test_binary_curve_is_interpolated_to_one_year_grid(tmp_path, monkeypatch):
+    curve = load_test_curve(tmp_path, monkeypatch)
+
+    assert (curve.start, curve.end) == (0, 120)
+    assert curve.at(50) == (50.0, 10.0)
+    assert curve.at(110) == (105.0, 15.0)
+
+
+def test_calibrate_returns_normalised_distribution(tmp_path, monkeypatch):
+    curve = load_test_curve(tmp_path, monkeypatch)
+
+    years, probs = calibration_curves.calibrate(50, 5, curve)
+
+    assert abs(sum(probs) - 1.0) < 1e-9
+    assert years[probs.index(max(probs))] == 50
+
+
+def test_window_envelope_is_read_from_the_cache(tmp_path, monkeypatch):
+    source = tmp_path / 'wiggle.14c'
+    # Means rise, dip (a plateau/reversal), then rise again.
+    source.write_text("0,0,10\n10,100,10\n20,60,30\n30,150,10\n")
+    monkeypatch.setitem(calibration_curves.CURVES, 'wiggle', str(source))
+    monkeypatch.setattr(calibration_curves, '_loaded', {})
+    curve = calibration_curves.load_curve('wiggle', cache_dir=str(tmp_path / 'cache'))
+
+    assert curve.max_sigma == 30.0
+    for low, high in [(70, 90), (0, 5), (120, 200), (95, 105)]:
+        start, stop = curve.window(low, high)
+        inside = [i for i in range(curve.count) if low <= curve.means[i] <= high]
+        assert start <= min(inside) and max(inside) < stop
+
+
+def test_concurrent_builds_do_not_share_a_temporary_file(tmp_path):
+    source = tmp_path / 'test.14c'
+    write_curve(source)
+    target = str(tmp_path / 'cache' / 'test.bin')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: calibration_curves.build_binary(str(source), target), range(16)))
+
+    assert os.listdir(tmp_path / 'cache') == ['test.bin']
+    assert calibration_curves.Curve('test', target).at(50) == (50.0, 10.0)
+
+
+def test_shipped_curve_is_found_from_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(calibration_curves, '_loaded', {})
+
+    curve = calibration_curves.load_curve('intcal20', cache_dir=str(tmp_path / 'cache'))
+
+    assert curve.start <= 5000 < curve.end
+    assert os.path.isabs(calibration_curves.CACHE_DIR)
+
+
+def test_select_curve_uses_material_and_delta_c13():
+    assert calibration_curves.select_curve({'material': 'shell (marine)'})[0] == 'marine20'
+    assert calibration_curves.select_curve({'material': 'eggshell'})[0] == 'intcal20'
+    assert calibration_curves.select_curve({'material': 'shell', 'delta_c13': '0.0'})[0] == 'intcal20'
+    assert calibration_curves.select_curve({'material': 'shell', 'delta_c13': '1.2'})[0] == 'marine20'
+    assert calibration_curves.select_curve({'material': 'charcoal', 'lat': '-33.9'})[0] == 'shcal20'
@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import calibration_curves
+from scripts.chronology import build_chronology, hpd_intervals, hpd_range
+
+
+def test_dates_share_one_axis_across_methods_and_schemas():
+    features = [
+        {'properties': {'labnr': 'Gif-6184', 'site': 'Abri Rihane', 'bp': '3490.0', 'std': '90.0'}},
+        {'properties': {'site': 'Jebel Irhoud', 'dates': [
+            {'dating_method': 'OSL', 'age': 300.0, 'error': 30.0, 'unit': 'ka'},
+            {'dating_method': 'TL', 'age': None, 'unit': 'ka'},
+        ]}},
+    ]
+
+    columns = build_chronology(features)
+
+    assert columns['method'] == ['C14', 'OSL']
+    assert columns['calibrated'] == [True, False]
+    # IntCal20 puts 3490 +/- 90 BP at roughly 3990-3490 cal BP.
+    assert 3900 < columns['cal_bp_from'][0] < 4100
+    assert 3400 < columns['cal_bp_to'][0] < 3600
+    assert columns['cal_bp_from'][1] == 360000.0
+    assert columns['cal_bp_to'][1] == 240000.0
+    assert columns['ce_mid'][1] == 1950 - 300000.0
+
+
+def test_hpd_range_covers_requested_mass():
+    years = [100, 101, 102, 103, 104]
+    probs = [0.05, 0.2, 0.5, 0.2, 0.05]
+
+    assert hpd_range(years, probs, mass=0.85) == (102, 103, 101)
+
+
+def test_hpd_intervals_keep_modes_apart():
+    years = [100, 101, 102, 103, 104, 105, 106]
+    probs = [0.3, 0.15, 0.01, 0.01, 0.01, 0.2, 0.32]
+
+    assert hpd_intervals(years, probs, mass=0.9) == [[106, 105], [101, 100]]
+    assert hpd_range(years, probs, mass=0.9)[1:] == (106, 100)
+
+
+def test_uncalibrated_c14_dates_stay_off_the_calendar_axis(monkeypatch, tmp_path):
+    monkeypatch.setitem(calibration_curves.CURVES, 'marine20', str(tmp_path / 'marine20.14c'))
+    features = [{'properties': {'labnr': 'Ly-1', 'material': 'marine shell', 'bp': '5000', 'std': '40'}}]
+
+    columns = build_chronology(features)
+
+    assert columns['calibrated'] == [False]
+    assert (columns['age'], columns['error']) == ([5000.0], [40.0])
+    for name in ('cal_bp_mid', 'cal_bp_from', 'cal_bp_to', 'cal_bp_ranges', 'ce_mid', 'ce_from', 'ce_to'):
+        assert columns[name] == [None]
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import cli
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _write(tmp_path, features):
+    path = tmp_path / 'data.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}), encoding='utf-8')
+    return str(path)
+
+
+def test_validate_reports_problems(tmp_path, capsys):
+    good = {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-5.0, 33.0]},
+            'properties': {'site': 'A', 'bp': '3490.0', 'std': ''}}
+    bad = {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [33.0, 190.0]},
+           'properties': {'site': 'B', 'bp': 'modern', 'std': '30.0'}}
+
+    assert cli.main(['validate', _write(tmp_path, [good])]) == 0
+    assert cli.main(['validate', _write(tmp_path, [good, bad])]) == 1
+    output = capsys.readouterr().out
+    assert 'invalid coordinates: 1 (features 1)' in output
+    assert 'non-numeric bp: 1 (features 1)' in output
+
+
+def test_quick_commands_skip_heavy_imports(tmp_path):
+    path = _write(tmp_path, [])
+    code = (
+        "import sys; from scripts import cli; cli.main(['stats', sys.argv[1]]); "
+        "heavy = {'pandas', 'requests', 'bs4', 'scripts.enrich_c14_data', 'scripts.calibration_curves'}; "
+        "print(sorted(heavy & set(sys.modules)))"
+    )
+    result = subprocess.run([sys.executable, '-c', code, path], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == '[]'
+
+
+def test_legacy_scripts_are_found_from_the_root(tmp_path, monkeypatch):
+    # As after a regular install: the package directory is not a checkout.
+    monkeypatch.setattr(cli, 'REPO_DIR', str(tmp_path / 'site-packages'))
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit, match='C14/standardize_and_merge.py not found .*-C/--root'):
+        cli.main(['-C', str(tmp_path), 'standardize'])
+
+    (tmp_path / 'C14').mkdir()
+    (tmp_path / 'C14' / 'standardize_and_merge.py').write_text(
+        "def standardize_and_merge(input_path, output_path):\n    open(output_path, 'w').write(input_path)\n")
+    cli.main(['-C', str(tmp_path), 'standardize', '--output', 'out.txt'])
+    assert (tmp_path / 'out.txt').read_text() == 'C14/data/output_full.geojson'
+
+
+def test_enrich_writes_a_separate_file_unless_asked():
+    parser = cli.build_parser()
+    assert parser.parse_args(['enrich']).output == cli.ENRICHED_PATH
+    assert parser.parse_args(['enrich', '--in-place']).in_place
+    with pytest.raises(SystemExit):
+        parser.parse_args(['enrich', '--in-place', '--output', 'x.geojson'])
+
+
+def test_regions_flags_fail_only_with_strict(tmp_path):
+    square = [[-10, 29], [-5, 29], [-5, 31], [-10, 31], [-10, 29]]
+    boundaries = tmp_path / 'boundaries.geojson'
+    boundaries.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'iso_a2': 'MA', 'name': 'Souss-Massa'},
+         'geometry': {'type': 'Polygon', 'coordinates': [square]}}]}))
+    dataset = _write(tmp_path, [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-30, 30]},
+                                 'properties': {'site': 'sea', 'country': 'MA'}}])
+    args = ['regions', '--input', dataset, '--output', str(tmp_path / 'regions.json'),
+            '--boundaries', str(boundaries)]
+
+    assert cli.main(args) == 0
+    assert cli.main(args + ['--strict']) == 1
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import export_columnar
+
+
+def _write(tmp_path, features):
+    path = tmp_path / 'data.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}), encoding='utf-8')
+    return str(path)
+
+
+def test_roundtrip_is_lossless(tmp_path):
+    features = [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-5.5, 33.25]},
+         'properties': {'labnr': 'Ly-1', 'bp': '3490.0', 'std': '35.5', 'site': 'A',
+                        'periods': ['Neolithic'], 'references': [{'author': 'X', 'year': 2001}]}},
+        {'type': 'Feature', 'geometry': None,
+         'properties': {'labnr': 'Ly-2', 'bp': '', 'std': '40.0', 'site': 'A', 'periods': []}},
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-15.68, 28.0]},
+         'properties': {'labnr': None, 'bp': '12000.0', 'std': '0.25', 'site': 'B',
+                        'periods': ['Neolithic'], 'extra': 1}},
+    ]
+    output = str(tmp_path / 'data.rqc')
+    export_columnar.write_columnar(_write(tmp_path, features), output)
+
+    assert export_columnar.read_columnar(output) == features
+
+
+def test_columns_are_typed_and_dictionary_encoded():
+    features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [0.0, 0.0]},
+                 'properties': {'bp': f'{100 * (i % 3)}.0', 'material': 'charcoal' if i % 2 else 'bone',
+                                'std': 'n/a' if i == 0 else '30.0'}}
+                for i in range(300)]
+    columns, geometry, arrays = export_columnar.encode(features)
+    by_name = {column['name']: (column, values) for column, values in zip(columns, arrays)}
+
+    bp, values = by_name['bp']
+    assert bp['type'] == 'number' and bp['string'] and list(values[:3]) == [0.0, 100.0, 200.0]
+    material, codes = by_name['material']
+    assert material['type'] == 'dict' and material['dtype'] == 'uint8'
+    assert material['dictionary'] == ['bone', 'charcoal'] and list(codes[:2]) == [0, 1]
+    # A non-numeric string keeps the whole column as dictionary codes.
+    assert by_name['std'][0]['type'] == 'dict'
+    assert [column['name'] for column in geometry] == ['lon', 'lat']
+
+
+def test_coordinate_properties_and_large_integers_survive(tmp_path):
+    features = [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-5.5, 33.25]},
+         'properties': {'lat': '31.0', 'lon': None, 'code': '1000000000000000.0'}},
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-6.0, 34.0]},
+         'properties': {'lat': '32.5', 'lon': None, 'code': '12.0'}},
+    ]
+    output = str(tmp_path / 'data.rqc')
+    export_columnar.write_columnar(_write(tmp_path, features), output)
+
+    assert export_columnar.read_columnar(output) == features
+    columns, _, _ = export_columnar.encode(features)
+    # JS prints 1e15 as '1000000000000000', so the column stays dictionary-encoded.
+    assert {column['name']: column['type'] for column in columns}['code'] == 'dict'
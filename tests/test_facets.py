@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import facets
+
+
+def test_encoding_picks_the_smallest_form():
+    assert facets.encode_bitmap([3, 900], 1000)[0] == 'array'
+    encoding, data = facets.encode_bitmap(list(range(100, 400)), 1000)
+    assert encoding == 'runs' and list(data) == [100, 300]
+    assert facets.encode_bitmap(list(range(0, 1000, 2)), 1000)[0] == 'bitmap'
+
+
+def test_select_and_counts_match_a_full_scan(tmp_path):
+    materials = ['charcoal', 'bone', 'shell', '']
+    features = [{'properties': {'material': materials[i % 4], 'country': 'MA' if i % 3 else 'ES',
+                                'periods': ['Neolithic', 'Iberomaurusian'][:i % 3]}}
+                for i in range(100)]
+    source = tmp_path / 'data.geojson'
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}), encoding='utf-8')
+    output = str(tmp_path / 'data.facets')
+    facets.write_facets(str(source), output)
+
+    index = facets.FacetIndex(output)
+    selection = index.select({'material': ['charcoal', 'bone'], 'periods': ['Iberomaurusian']})
+
+    expected = [i for i, f in enumerate(features)
+                if f['properties']['material'] in ('charcoal', 'bone') and 'Iberomaurusian' in f['properties']['periods']]
+    assert index.ordinals(selection) == expected
+    counts = index.facet_counts(selection)
+    assert counts['country'] == {'MA': sum(1 for i in expected if i % 3), 'ES': sum(1 for i in expected if not i % 3)}
+    assert index.facet_counts()['material'] == {'charcoal': 25, 'bone': 25, 'shell': 25}
+    assert '' not in index.facets['material']
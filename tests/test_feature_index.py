@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import feature_index
+from scripts.feature_index import FeatureIndex
+
+FEATURES = [
+    {'type': 'Feature', 'properties': {'id': '1', 'labnr': 'Gif-6184', 'site': 'Abri {Rihane} [x]'}, 'geometry': None},
+    {'type': 'Feature', 'properties': {'id': '2', 'labnr': 'OxA-11321', 'site': 'Taforalt "Grotte des Pigeons"'},
+     'geometry': {'type': 'Point', 'coordinates': [-2.4, 34.8]}},
+    {'type': 'Feature', 'properties': {'id': '3', 'labnr': 'Gif-6184', 'site': 'Rhirane', 'note': 'Épipaléolithique'},
+     'geometry': None},
+    {'type': 'Feature', 'properties': {'id': '4', 'labnr': None, 'site': 'Jebel Irhoud'}, 'geometry': None},
+]
+
+
+def _write(tmp_path, features, **kwargs):
+    path = tmp_path / 'data.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'metadata': {'features': '[not here]'},
+                                'features': features}, ensure_ascii=False, **kwargs), encoding='utf-8')
+    return str(path)
+
+
+def test_lookups_return_the_original_features(tmp_path):
+    path = _write(tmp_path, FEATURES, indent=2)
+
+    with FeatureIndex(path) as index:
+        assert len(index) == 4
+        assert [index.feature(i) for i in range(4)] == FEATURES
+        assert index.get('labnr', 'Gif-6184') == [FEATURES[0], FEATURES[2]]
+        assert index.get('id', 4) == [FEATURES[3]]
+        assert index.get('labnr', 'Gif-618') == []
+        assert [key for key, _ in index.range('labnr', 'Gif', 'Gig')] == ['Gif-6184', 'Gif-6184']
+        assert [f['properties']['id'] for _, f in index.range('labnr')] == ['1', '3', '2']
+
+
+def test_sidecar_is_rebuilt_when_the_file_changes(tmp_path):
+    path = _write(tmp_path, FEATURES[:2])
+    with FeatureIndex(path) as index:
+        assert len(index) == 2
+    assert os.path.exists(feature_index.index_path_for(path))
+
+    _write(tmp_path, FEATURES, separators=(',', ':'))
+    with FeatureIndex(path) as index:
+        assert len(index) == 4
+        assert index.get('id', '3') == [FEATURES[2]]
@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import instrument
+
+
+def test_spans_record_counts_memory_and_nesting(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrument, '_enabled', True)
+    instrument.drain()
+
+    with instrument.span('stage', bytes_read=10):
+        with instrument.span('child', cat='io'):
+            data = [0] * 100000
+        instrument.count('records', 3)
+        instrument.count('records', 2)
+        del data
+
+    events = {e['name']: e for e in instrument.drain()}
+    assert events['stage']['args']['records'] == 5
+    assert events['stage']['args']['bytes_read'] == 10
+    # The parent's peak includes the allocation made inside the child.
+    assert events['stage']['args']['peak_traced_bytes'] >= events['child']['args']['peak_traced_bytes'] >= 800000
+    assert events['child']['ts'] >= events['stage']['ts']
+
+    path = tmp_path / 'trace.json'
+    instrument.write_trace(str(path), list(events.values()))
+    with open(path) as f:
+        trace = json.load(f)
+    assert [e['name'] for e in trace['traceEvents']] == ['stage', 'child']
+    assert events['stage']['args']['max_rss_growth_kb'] >= 0
+    # Tracing started by the outermost span ends with it.
+    assert not tracemalloc.is_tracing()
+
+
+def test_spans_are_free_when_disabled(monkeypatch):
+    monkeypatch.setattr(instrument, '_enabled', False)
+    instrument.drain()
+
+    with instrument.span('stage'):
+        instrument.count('records')
+
+    assert instrument.drain() == []
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.pipeline import Stage, imported_modules, run_pipeline
+
+SCRIPT = '''
+def copy(src, dst, suffix):
+    with open(src) as f:
+        data = f.read()
+    with open(dst, 'w') as f:
+        f.write(data + suffix)
+
+
+def nothing(**kwargs):
+    pass
+'''
+
+
+def make_stages(tmp_path):
+    script = tmp_path / 'stage.py'
+    script.write_text(SCRIPT)
+    a, b, c, d = (str(tmp_path / name) for name in ('a.txt', 'b.txt', 'c.txt', 'd.txt'))
+    return a, d, [
+        Stage('first', str(script), 'copy', inputs=[a], outputs=[b], kwargs={'src': a, 'dst': b, 'suffix': '1'}),
+        Stage('second', str(script), 'copy', inputs=[b], outputs=[c], kwargs={'src': b, 'dst': c, 'suffix': '2'}),
+        Stage('other', str(script), 'copy', inputs=[a], outputs=[d], kwargs={'src': a, 'dst': d, 'suffix': '3'}),
+    ]
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    a, d, stages = make_stages(tmp_path)
+    state_path = str(tmp_path / 'state.json')
+    with open(a, 'w') as f:
+        f.write('x')
+
+    assert set(run_pipeline(stages, jobs=2, state_path=state_path).values()) == {'ran'}
+    assert set(run_pipeline(stages, jobs=2, state_path=state_path).values()) == {'cached'}
+
+    # A clobbered output is rebuilt even though its inputs did not change.
+    with open(d, 'w') as f:
+        f.write('tampered')
+    status = run_pipeline(stages, jobs=2, state_path=state_path)
+    assert status == {'first': 'cached', 'second': 'cached', 'other': 'ran'}
+    with open(d) as f:
+        assert f.read() == 'x3'
+
+
+def test_missing_input_skips_downstream(tmp_path):
+    a, _, stages = make_stages(tmp_path)
+
+    status = run_pipeline(stages, targets=['second'], jobs=1, state_path=str(tmp_path / 'state.json'))
+
+    assert status == {'first': 'skipped', 'second': 'skipped'}
+
+
+def test_output_directories_are_created(tmp_path):
+    a, _, stages = make_stages(tmp_path)
+    with open(a, 'w') as f:
+        f.write('x')
+    nested = str(tmp_path / 'new' / 'dir' / 'b.txt')
+    stage = Stage('first', stages[0].script, 'copy', inputs=[a], outputs=[nested],
+                  kwargs={'src': a, 'dst': nested, 'suffix': '1'})
+
+    assert run_pipeline([stage], jobs=1, state_path=str(tmp_path / 'state.json')) == {'first': 'ran'}
+    with open(nested) as f:
+        assert f.read() == 'x1'
+
+
+def test_failed_stage_blocks_downstream(tmp_path):
+    a, _, stages = make_stages(tmp_path)
+    with open(a, 'w') as f:
+        f.write('x')
+    failing = Stage('first', stages[0].script, 'copy', inputs=[a], outputs=stages[0].outputs,
+                    kwargs={'src': str(tmp_path / 'absent.txt'), 'dst': stages[0].outputs[0], 'suffix': '1'})
+
+    status = run_pipeline([failing, stages[1]], jobs=1, state_path=str(tmp_path / 'state.json'))
+
+    assert status == {'first': 'failed', 'second': 'skipped'}
+
+
+def test_stale_output_does_not_count_as_written(tmp_path):
+    a, _, stages = make_stages(tmp_path)
+    with open(a, 'w') as f:
+        f.write('x')
+    stale = stages[0].outputs[0]
+    with open(stale, 'w') as f:
+        f.write('from an earlier run')
+    idle = Stage('first', stages[0].script, 'nothing', inputs=[a], outputs=[stale])
+
+    assert run_pipeline([idle], jobs=1, state_path=str(tmp_path / 'state.json')) == {'first': 'failed'}
+
+
+def test_stage_code_includes_imported_package_modules():
+    scripts_dir = os.path.join(os.path.dirname(__file__), '..', 'scripts')
+    modules = [os.path.basename(path) for path in imported_modules(os.path.join(scripts_dir, 'stats_cube.py'))]
+
+    # stats_cube imports chronology, which imports the calibration modules.
+    assert {'chronology.py', 'calibration_cache.py', 'calibration_curves.py'} <= set(modules)
+    assert 'stats_cube.py' not in modules
+
+
+def test_failed_stage_events_reach_the_trace(tmp_path):
+    a, _, stages = make_stages(tmp_path)
+    with open(a, 'w') as f:
+        f.write('x')
+    failing = Stage('first', stages[0].script, 'copy', inputs=[a], outputs=stages[0].outputs,
+                    kwargs={'src': str(tmp_path / 'absent.txt'), 'dst': stages[0].outputs[0], 'suffix': '1'})
+    trace = tmp_path / 'trace.json'
+
+    # One worker runs both stages; the failed stage's span must not leak into 'other'.
+    run_pipeline([failing, stages[2]], jobs=1, state_path=str(tmp_path / 'state.json'), trace=str(trace))
+
+    events = {e['name']: e for e in json.loads(trace.read_text())['traceEvents']}
+    assert events['first']['args']['error'].startswith('FileNotFoundError')
+    assert 'error' not in events['other']['args']
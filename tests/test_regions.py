@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import regions
+
+
+def _square(west, south, east, north):
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+
+def _boundaries(tmp_path):
+    features = [
+        # Morocco with a hole (a lake), plus a second part.
+        {'type': 'Feature', 'properties': {'iso_a2': 'MA', 'name': 'Souss-Massa'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [
+             [_square(-10, 29, -5, 31), _square(-8, 30, -7, 30.5)],
+             [_square(-5, 33, -2, 35)]]}},
+        {'type': 'Feature', 'properties': {'iso_a2': 'ES', 'name': 'Canarias'},
+         'geometry': {'type': 'Polygon', 'coordinates': [_square(-18, 27.5, -13.5, 29.5)]}},
+        # Land at the swapped position of a (lon, lat) = (20, -7) typo.
+        {'type': 'Feature', 'properties': {'iso_a2': 'MA', 'name': 'Swap target'},
+         'geometry': {'type': 'Polygon', 'coordinates': [_square(-8, 19, -6, 21)]}},
+    ]
+    path = tmp_path / 'boundaries.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}))
+    return str(path)
+
+
+def _point(lon, lat, country='MA', site='site'):
+    return {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'site': site, 'country': country, 'labnr': f'{site}-1'}}
+
+
+def test_prepared_shape_handles_holes_and_parts(tmp_path):
+    index = regions.BoundaryIndex.load(_boundaries(tmp_path))
+    assert index.locate(-9, 30).region == 'Souss-Massa'
+    assert index.locate(-7.5, 30.25) is None
+    assert index.locate(-3, 34).country == 'MA'
+    assert index.locate(-15.68, 28.0).country == 'ES'
+    assert index.locate(-30, 30) is None
+
+
+def test_assign_regions_flags(tmp_path):
+    index = regions.BoundaryIndex.load(_boundaries(tmp_path))
+    features = [
+        _point(-9, 30, 'Morocco', 'ok'),
+        _point(-15.68, 28.0, 'MA', 'Acusa'),
+        _point(-30, 30, 'MA', 'sea'),
+        _point(20, -7, 'MA', 'swapped'),
+        {'type': 'Feature', 'geometry': None, 'properties': {'site': 'nowhere'}},
+    ]
+    columns = regions.assign_regions(features, index)
+    assert columns['recorded_country'][0] == 'MA'
+    assert columns['country'] == ['MA', 'ES', None, None, None]
+    assert columns['region'][:2] == ['Souss-Massa', 'Canarias']
+    assert columns['flags'] == [[], ['country_mismatch'], ['ocean'], ['ocean', 'swapped'], ['invalid']]
+
+
+def test_locate_many_matches_locate(tmp_path):
+    index = regions.BoundaryIndex.load(_boundaries(tmp_path))
+    points = [(-20 + i * 0.37, 26 + (i * 7 % 50) * 0.2) for i in range(100)] * 3
+    assert index.locate_many(points) == [index.locate(lon, lat) for lon, lat in points]
+
+
+def test_write_regions(tmp_path):
+    dataset = tmp_path / 'data.geojson'
+    dataset.write_text(json.dumps({'type': 'FeatureCollection',
+                                   'features': [_point(-9, 30), _point(-15.68, 28.0, site='Acusa')]}))
+    output = tmp_path / 'regions.json'
+    summary = regions.write_regions(str(dataset), str(output), _boundaries(tmp_path))
+    assert summary == {'country_mismatch': 1}
+    report = json.loads(output.read_text())
+    assert report['summary'] == summary
+    assert report['columns']['site'] == ['site', 'Acusa']
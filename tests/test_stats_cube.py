@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import stats_cube
+
+
+def _feature(site, material, periods, dates, country='MA'):
+    return {'type': 'Feature', 'geometry': None,
+            'properties': {'site': site, 'country': country, 'material': material, 'periods': periods,
+                           'dates': [{'dating_method': method, 'age': age, 'error': error}
+                                     for method, age, error in dates]}}
+
+
+FEATURES = [
+    _feature('A', 'charcoal', ['Neolithic'], [('C14', '5200.0', '40.0')]),
+    _feature('A', 'bone', ['Neolithic', 'Epipalaeolithic'], [('C14', '7100', '60')]),
+    _feature('B', 'charcoal', [], [('C14', '5400', '30'), ('OSL', '', '')]),
+    # Legacy layout: one C14 date in bp/std.
+    {'type': 'Feature', 'properties': {'site': 'C', 'country': 'MA', 'bp': '900', 'std': '25', 'periods': None}},
+]
+
+
+def test_every_grouping_is_precomputed():
+    cube = stats_cube.build_cube(FEATURES)
+    assert len(cube['cells']) == 2 ** len(stats_cube.DIMENSIONS)
+    assert cube['values']['period'] == ['Epipalaeolithic', 'Neolithic', 'Unknown']
+    assert cube['values']['method'] == ['C14', 'OSL']
+
+
+def test_cells():
+    cube = stats_cube.StatsCube(stats_cube.build_cube(FEATURES))
+    total = cube.cell()
+    assert total['count'] == 5
+    assert total['bp_histogram'] == {500: 1, 5000: 2, 7000: 1}
+    assert total['std_histogram'] == {25: 3, 50: 1}
+    assert total['bp_quantiles'] == [900, 4125, 5300, 5825, 7100]
+
+    assert cube.cell(site='A')['count'] == 2
+    assert cube.cell(site='A', material='charcoal')['bp_quantiles'] == [5200] * 5
+    assert cube.cell(site='B', method='OSL') == {'count': 1, 'bp_histogram': {}, 'std_histogram': {},
+                                                  'bp_quantiles': None, 'std_quantiles': None}
+    assert cube.cell(site='C', method='C14')['bp_histogram'] == {500: 1}
+    assert cube.cell(site='Z') is None
+    assert cube.cell(site='B', material='bone') is None
+
+
+def test_multi_valued_periods_count_once_per_period():
+    cube = stats_cube.StatsCube(stats_cube.build_cube(FEATURES))
+    periods = cube.group_by('period')
+    assert {period: cell['count'] for period, cell in periods.items()} == \
+        {'Epipalaeolithic': 1, 'Neolithic': 2, 'Unknown': 3}
+    assert cube.group_by('material', period='Neolithic')['bone']['count'] == 1
+
+
+def test_ages_are_normalised_to_years():
+    features = FEATURES + [_feature('D', 'tooth', [], [('OSL', 300.0, 30.0)])]
+    features[-1]['properties']['dates'][0]['unit'] = 'ka'
+    features.append(_feature('D', 'tooth', [], [('ESR', 5, 1)]))
+    features[-1]['properties']['dates'][0]['unit'] = 'furlongs'
+    cube = stats_cube.StatsCube(stats_cube.build_cube(features))
+    site = cube.cell(site='D')
+    assert site['count'] == 2
+    assert site['bp_histogram'] == {300000: 1}
+    assert site['bp_quantiles'] == [300000] * 5
+    assert site['std_quantiles'] == [30000] * 5
+    assert cube.cell()['bp_quantiles'][0] == 900
+
+
+def test_write_and_load(tmp_path):
+    dataset = tmp_path / 'data.geojson'
+    dataset.write_text(json.dumps({'type': 'FeatureCollection', 'features': FEATURES}))
+    output = tmp_path / 'cube.json'
+    cells = stats_cube.write_cube(str(dataset), str(output))
+    cube = stats_cube.StatsCube.load(str(output))
+    assert cells == sum(len(rows) for rows in cube.cube['cells'].values())
+    assert cube.cell(country='MA')['count'] == 5
+    assert len(cube.cube['stats']) < cells
@@ -0,0 +1,106 @@
+import copy
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import store
+
+FEATURES = [
+    {'type': 'Feature', 'properties': {
+        'id': '66294', 'labnr': 'Gif-6184', 'material': 'unknown', 'site': 'Abri Rihane', 'country': 'MA',
+        'references': [{'author': 'van Willigen', 'year': '2008'}],
+        'dates': [{'dating_method': 'C14', 'age': '3490.0', 'error': '90.0', 'unit': 'BP'}]},
+     'geometry': {'type': 'Point', 'coordinates': [-1.87, 34.48]}},
+    {'type': 'Feature', 'properties': {
+        'id': '139844', 'labnr': 'Gif-6184', 'material': 'unknown', 'site': 'Rhirane', 'country': 'MA',
+        'references': [{'author': 'CalPal'}],
+        'dates': [{'dating_method': 'C14', 'age': '3490.0', 'error': '90.0', 'unit': 'BP'}]},
+     'geometry': {'type': 'Point', 'coordinates': [-1.87, 34.48]}},
+    {'type': 'Feature', 'properties': {
+        'site': 'Jebel Irhoud', 'country': 'MA', 'references': '',
+        'dates': [{'dating_method': 'OSL', 'reference': 'Hublin et al. 2017', 'age': 300.0, 'error': 30.0, 'unit': 'ka'}]},
+     'geometry': {'type': 'Point', 'coordinates': [-8.883333, 31.85]}},
+]
+
+
+def _import(tmp_path):
+    source = tmp_path / 'data.geojson'
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': FEATURES, 'metadata': {'n': 3}}, indent=2),
+                      encoding='utf-8')
+    db = str(tmp_path / 'store.sqlite')
+    store.import_geojson(str(source), db)
+    return source, db
+
+
+def test_export_reproduces_the_imported_file(tmp_path):
+    source, db = _import(tmp_path)
+    output = tmp_path / 'out.geojson'
+
+    assert store.export_geojson(db, str(output)) == 3
+    assert output.read_text(encoding='utf-8') == source.read_text(encoding='utf-8')
+
+
+def test_upserts_match_on_labnr_and_source_record(tmp_path):
+    _, db = _import(tmp_path)
+    conn = store.connect(db)
+
+    edited = copy.deepcopy(FEATURES[1])
+    edited['properties']['material'] = 'charcoal'
+    store.upsert_feature(conn, edited)
+    new = copy.deepcopy(FEATURES[0])
+    new['properties']['id'] = '70000'
+    store.upsert_feature(conn, new)
+
+    records = store.samples_by_labnr(conn, 'Gif-6184')
+    assert [r['properties']['id'] for r in records] == ['66294', '139844', '70000']
+    assert records[1] == edited
+    # A reader on another connection sees committed data; WAL keeps it unblocked.
+    reader = store.connect(db)
+    assert reader.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert [f['properties'].get('id') for f in store.iter_features(reader)] == ['66294', '139844', None, '70000']
+    assert [name for _, name, _, _ in store.sites_in_bbox(reader, -2, 34, -1, 35)] == ['Abri Rihane', 'Rhirane']
+
+
+def test_import_merges_and_keeps_store_edits(tmp_path):
+    source, db = _import(tmp_path)
+    conn = store.connect(db)
+    edited = copy.deepcopy(FEATURES[0])
+    edited['properties']['material'] = 'charcoal'
+    store.upsert_feature(conn, edited)
+    local = copy.deepcopy(FEATURES[0])
+    local['properties']['id'] = '70000'
+    store.upsert_feature(conn, local)
+    conn.close()
+
+    # Unchanged upstream: nothing is rewritten and the edit survives.
+    assert store.import_geojson(str(source), db) == 0
+
+    # Upstream adds a record, changes one and drops one.
+    changed = copy.deepcopy(FEATURES[1])
+    changed['properties']['site'] = 'Rhirane II'
+    added = copy.deepcopy(FEATURES[0])
+    added['properties'].update(id='80000', labnr='Ly-1')
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': [FEATURES[0], changed, added]}),
+                      encoding='utf-8')
+    assert store.import_geojson(str(source), db) == 2
+
+    conn = store.connect(db)
+    features = list(store.iter_features(conn))
+    assert [f['properties'].get('id') for f in features] == ['66294', '139844', '80000', '70000']
+    assert features[0] == edited
+    assert features[1] == changed
+    # Rhirane and Jebel Irhoud no longer have records.
+    assert [name for name, in conn.execute('SELECT name FROM sites ORDER BY name')] == ['Abri Rihane', 'Rhirane II']
+
+
+def test_export_keeps_feature_key_order(tmp_path):
+    feature = {'type': 'Feature', 'geometry': FEATURES[0]['geometry'], 'properties': FEATURES[0]['properties']}
+    source = tmp_path / 'data.geojson'
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': [feature]}, indent=2), encoding='utf-8')
+    db = str(tmp_path / 'store.sqlite')
+    store.import_geojson(str(source), db)
+    output = tmp_path / 'out.geojson'
+    store.export_geojson(db, str(output))
+    assert output.read_text(encoding='utf-8') == source.read_text(encoding='utf-8')
@@ -1,5 +1,6 @@
 import pandas as pd
 import json
+import os
 
 def create_geojson_feature(row):
     """Creates a GeoJSON feature from a row of the merged data."""
@@ -21,10 +22,10 @@ def create_geojson_feature(row):
     }
     return feature
 
-def main():
+def main(date_table="dateTable.csv", site_table="siteTable.csv", output_path="new_data.json"):
     # Read the data
-    date_df = pd.read_csv("dateTable.csv")
-    site_df = pd.read_csv("siteTable.csv")
+    date_df = pd.read_csv(date_table)
+    site_df = pd.read_csv(site_table)
 
     # Merge the data
     merged_df = pd.merge(date_df, site_df, on="Site_ID")
@@ -42,8 +43,10 @@ def main():
     }
 
     # Save to file
-    with open("new_data.json", "w") as f:
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w") as f:
         json.dump(feature_collection, f, indent=2)
+    os.replace(tmp_path, output_path)
 
 if __name__ == "__main__":
     main()
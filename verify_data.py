@@ -1,13 +1,24 @@
 import json
+import os
 
-def main():
-    with open("C14/data/output_full.geojson", "r") as f:
+def main(path="C14/data/output_full.geojson", output_path=None):
+    """
+    Checks that `path` parses as GeoJSON. With `output_path`, a summary is
+    written there on success, so pipeline stages can depend on the check.
+    """
+    with open(path, "r") as f:
         try:
             data = json.load(f)
-            print("Successfully loaded C14/data/output_full.geojson")
+            print(f"Successfully loaded {path}")
             print(f"Total features: {len(data['features'])}")
         except json.JSONDecodeError as e:
             print(f"Error decoding JSON: {e}")
+            raise
+    if output_path:
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'path': path, 'features': len(data['features'])}, f)
+        os.replace(tmp_path, output_path)
 
 if __name__ == "__main__":
     main()